@@ -1,7 +1,22 @@
 from .core.api import JSON, ensure_json, parse_json
+from .core.bulk import parse_many
+from .core.cache import PrefixCache, disable_prefix_cache, enable_prefix_cache
 from .core.complete import fix
+from .core.direct import parse_direct
+from .core.dispatch import Dispatcher, dispatcher
+from .core.events import EventParser, parse_events
 from .core.exceptions import *
+from .core.files import fix_file, repair_file
+from .core.incremental import IncrementalParser
+from .core.instrument import Stats, disable_instrumentation, enable_instrumentation
+from .core.locate import JSONLocator
+from .core.multiplex import StreamMultiplexer
 from .core.myelin import fix_fast
+from .core.numeric import compact_arrays
 from .core.options import *
+from .core.project import parse_path
+from .core.result import FixResult, fix_lazy
+from .core.split import DocumentSplitter, split_documents
+from .core.stream import JSONStream, parse_stream
 
 loads = decode = parse_json
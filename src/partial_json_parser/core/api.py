@@ -1,26 +1,48 @@
-from typing import Callable, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Union, overload
 
 from .complete import fix
+from .dispatch import dispatcher
 from .myelin import fix_fast
 from .options import *
+from .utf8 import BytesLike
+
+if TYPE_CHECKING:
+    from typing import Literal
 
 Number = Union[int, float]
 JSON = Union[str, bool, Number, List["JSON"], Dict[str, "JSON"], None]
 
 
-def parse_json(json_string: str, allow_partial: Union[Allow, int] = ALL, parser: Optional[Callable[[str], JSON]] = None, use_fast_fix=True) -> JSON:
+def parse_json(
+    json_string: Union[str, BytesLike],
+    allow_partial: Union[Allow, int] = ALL,
+    parser: Optional[Callable[..., JSON]] = None,
+    use_fast_fix: Union[bool, "Literal['auto']"] = True,
+) -> JSON:
+    if use_fast_fix == "auto":
+        return dispatcher.parse_json(json_string, allow_partial, parser)
+
     if parser is None:
         from json import loads as parser
 
     return parser(ensure_json(json_string, allow_partial, use_fast_fix))
 
 
-def ensure_json(json_string: str, allow_partial: Union[Allow, int] = ALL, use_fast_fix=True) -> str:
-    """get the completed JSON string"""
+@overload
+def ensure_json(json_string: str, allow_partial: Union[Allow, int] = ALL, use_fast_fix: Union[bool, "Literal['auto']"] = True) -> str: ...
+@overload
+def ensure_json(json_string: BytesLike, allow_partial: Union[Allow, int] = ALL, use_fast_fix: Union[bool, "Literal['auto']"] = True) -> bytes: ...
+
+
+def ensure_json(json_string: Union[str, BytesLike], allow_partial: Union[Allow, int] = ALL, use_fast_fix: Union[bool, "Literal['auto']"] = True):
+    """get the completed JSON string, or the completed UTF-8 bytes for bytes-like input"""
+
+    if use_fast_fix == "auto":
+        return dispatcher.ensure_json(json_string, allow_partial)
 
     if use_fast_fix:
         head, tail = fix_fast(json_string, allow_partial)
     else:
         head, tail = fix(json_string, allow_partial)
 
-    return head + tail
+    return head + tail  # type: ignore  # both are str or both are bytes
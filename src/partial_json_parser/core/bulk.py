@@ -0,0 +1,56 @@
+from functools import partial
+from json import JSONDecodeError as StdJSONDecodeError
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+from .api import JSON, parse_json
+from .exceptions import JSONDecodeError, MalformedJSON
+from .options import *
+from .utf8 import BytesLike
+
+Result = Union[JSON, JSONDecodeError]
+
+
+def parse_or_error(json_string: Union[str, BytesLike], allow_partial: Union[Allow, int] = ALL) -> Result:
+    """parse a (partial) JSON string, returning the error instead of raising it"""
+
+    try:
+        return parse_json(json_string, allow_partial)
+    except JSONDecodeError as err:
+        return err
+    except (StdJSONDecodeError, AssertionError, IndexError) as err:
+        return MalformedJSON(*err.args)
+    except (UnicodeDecodeError, RecursionError) as err:  # invalid UTF-8, or nested deeper than `json.loads` can decode
+        return MalformedJSON(str(err))
+
+
+def parse_many(
+    json_strings: Iterable[Union[str, BytesLike]], allow_partial: Union[Allow, int] = ALL, workers: Optional[int] = None, chunksize=256, ordered=True
+) -> Iterator[Union[Result, Tuple[int, Result]]]:
+    """
+    parse many (partial) JSON strings in a process pool
+
+    Each `PartialJSON` or `MalformedJSON` is returned in place of its value instead of aborting the batch.
+    Inputs are sent to the `workers` processes (the CPU count by default) in batches of `chunksize`.
+    The values are yielded in input order, or as `(index, value)` pairs in completion order if `ordered` is false.
+    With `workers=0`, the inputs are parsed serially in this process.
+    """
+
+    function = partial(parse_or_error, allow_partial=compile_allow(allow_partial))
+
+    if workers == 0:
+        results = map(function, json_strings)
+        yield from results if ordered else enumerate(results)
+        return
+
+    from multiprocessing import Pool
+
+    with Pool(workers) as pool:
+        if ordered:
+            yield from pool.imap(function, json_strings, chunksize)
+        else:
+            yield from pool.imap_unordered(partial(indexed, function), enumerate(json_strings), chunksize)
+
+
+def indexed(function, item: Tuple[int, Union[str, BytesLike]]):
+    index, json_string = item
+    return index, function(json_string)
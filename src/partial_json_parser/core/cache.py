@@ -0,0 +1,104 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List
+
+from . import myelin
+from .myelin import ScanState
+
+
+class Entry:
+    __slots__ = ("key", "json_string", "state")
+
+    def __init__(self, key: str, json_string: str, state: ScanState):
+        self.key = key
+        self.json_string = json_string
+        self.state = state
+
+
+class PrefixCache:
+    """
+    Remember the scan states of recent inputs, so that scanning an input which extends one of them resumes from its state
+
+    Entries are bucketed by their first `min_length` characters, and shorter inputs are not cached at all.
+    The least recently used entries are evicted once there are more than `maxsize` of them or more than `max_chars` characters in total.
+    """
+
+    def __init__(self, maxsize=1024, max_chars=2**26, min_length=256):
+        self.maxsize = maxsize
+        self.max_chars = max_chars
+        self.min_length = min_length
+
+        self.hits = 0
+        self.misses = 0
+        self.chars = 0
+
+        self.buckets: Dict[str, List[Entry]] = {}
+        self.entries: "OrderedDict[Entry, None]" = OrderedDict()
+        self.lock = Lock()
+
+    def scan(self, json_string: str):
+        if len(json_string) < self.min_length:
+            state = ScanState()
+            state.scan(json_string)
+            return state
+
+        key = json_string[: self.min_length]
+
+        with self.lock:
+            best = None
+            for entry in self.buckets.get(key, ()):
+                if len(entry.json_string) <= len(json_string) and (best is None or len(entry.json_string) > len(best.json_string)):
+                    if json_string.startswith(entry.json_string):
+                        best = entry
+
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.remove(best)  # it is superseded by this input
+
+        # the cached state may still be used by the caller who stored it
+        state = ScanState() if best is None else best.state.copy()
+        state.scan(json_string)
+
+        with self.lock:
+            entry = Entry(key, json_string, state)
+            self.buckets.setdefault(key, []).append(entry)
+            self.entries[entry] = None
+            self.chars += len(json_string)
+
+            while len(self.entries) > self.maxsize or self.chars > self.max_chars:
+                self.remove(next(iter(self.entries)))
+
+        return state
+
+    def remove(self, entry: Entry):
+        del self.entries[entry]
+        self.chars -= len(entry.json_string)
+
+        bucket = self.buckets[entry.key]
+        bucket.remove(entry)
+        if not bucket:
+            del self.buckets[entry.key]
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+            self.entries.clear()
+            self.chars = 0
+
+    def info(self):
+        """a snapshot of the counters"""
+
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries), "chars": self.chars}
+
+
+def enable_prefix_cache(maxsize=1024, max_chars=2**26, min_length=256):
+    """make `fix_fast` (and thus `ensure_json` and `parse_json`) reuse the scan states of recent inputs"""
+
+    myelin.prefix_cache = PrefixCache(maxsize, max_chars, min_length)
+    return myelin.prefix_cache
+
+
+def disable_prefix_cache():
+    myelin.prefix_cache = None
@@ -0,0 +1,128 @@
+from struct import Struct, error
+from typing import Iterable, List, Tuple
+from zlib import crc32
+
+from .exceptions import InvalidCheckpoint
+from .myelin import ScanState
+
+MAGIC = b"PJSC"
+VERSION = 1
+WINDOW = 1024  # how many characters at each end of the scanned prefix are checksummed
+MARGIN = 32  # how many characters on each side of a recorded position are checksummed
+
+# magic, version, whether inside a string, first token, last token, offset, last token index, last string start and end, checksum, depth
+header = Struct("<4sBBccqqqqII")
+
+
+def checksum(json_string: str, offset: int, positions: Iterable[int]):
+    """
+    the CRC-32 of the first and the last `WINDOW` characters of `json_string[:offset]` and of the characters around `positions`
+
+    So it does not grow with the buffer, but only with the number of positions, which are where the scan state points to.
+    """
+
+    head = json_string[: min(WINDOW, offset)]
+    tail = json_string[max(WINDOW, offset - WINDOW) : offset]
+    crc = crc32(tail.encode("utf-8", "surrogatepass"), crc32(head.encode("utf-8", "surrogatepass")))
+
+    for position in positions:
+        if position != -1:
+            crc = crc32(json_string[max(0, position - MARGIN) : min(offset, position + MARGIN + 1)].encode("utf-8", "surrogatepass"), crc)
+
+    return crc
+
+
+def recorded_positions(state: ScanState):
+    return [*(position for position, _ in state.stack), state.last_token[0], state.last_string_start, state.last_string_end]
+
+
+def dump_checkpoint(state: ScanState, json_string: str) -> bytes:
+    """
+    encode the scan state of `json_string` into a compact versioned checkpoint, whose size only grows with the nesting depth
+
+    The checkpoint holds the offsets of the state along with a checksum of the ends of the scanned prefix, see `load_checkpoint`.
+    """
+
+    index, char = state.last_token
+    positions = [position for position, _ in state.stack]
+
+    return b"".join(
+        (
+            header.pack(
+                MAGIC,
+                VERSION,
+                state.in_string,
+                (state.first_token or "\0").encode(),
+                (char or "\0").encode(),
+                state.offset,
+                index,
+                state.last_string_start,
+                state.last_string_end,
+                checksum(json_string, state.offset, recorded_positions(state)),
+                len(positions),
+            ),
+            Struct(f"<{len(positions)}q").pack(*positions),
+            "".join(char for _, char in state.stack).encode(),
+        )
+    )
+
+
+def load_checkpoint(data: bytes, json_string: str) -> ScanState:
+    """
+    decode a checkpoint of `json_string`, or of a prefix of it, into a scan state which `ScanState.scan` resumes from
+
+    `InvalidCheckpoint` is raised if it is not a checkpoint of a supported version, or if it does not match `json_string`:
+    the checksum must match, and the recorded brackets and quotes must be found at their offsets.
+
+    Note that the checksum only covers both ends of the scanned prefix and the surroundings of the recorded positions, so that loading
+    does not take time proportional to the buffer. A buffer which was changed elsewhere, in a way that moves no recorded token, is not
+    detected, and the scan resumes with a state which does not match it.
+    """
+
+    try:
+        magic, version, in_string, first_token, char, offset, index, last_string_start, last_string_end, crc, depth = header.unpack_from(data)
+    except error as err:
+        raise InvalidCheckpoint("the checkpoint is truncated") from err
+
+    if magic != MAGIC:
+        raise InvalidCheckpoint("not a scan checkpoint")
+    if version != VERSION:
+        raise InvalidCheckpoint(f"unsupported checkpoint version {version}, expected {VERSION}")
+    if len(data) != header.size + depth * 9:
+        raise InvalidCheckpoint("the checkpoint is truncated")
+
+    if not 0 <= offset <= len(json_string):
+        raise InvalidCheckpoint(f"the checkpoint is at offset {offset}, but the buffer only has {len(json_string)} characters")
+
+    try:
+        brackets = data[header.size + depth * 8 :].decode("ascii")
+        first_token, char = first_token.decode("ascii").strip("\0"), char.decode("ascii").strip("\0")
+    except UnicodeDecodeError as err:
+        raise InvalidCheckpoint("the checkpoint is corrupted") from err
+
+    if in_string not in (0, 1) or first_token not in ("", *'[]{}"') or char not in ("", *'[]{}"') or brackets.strip("[{"):
+        raise InvalidCheckpoint("the checkpoint is corrupted")
+
+    positions = Struct(f"<{depth}q").unpack_from(data, header.size)
+    stack: List[Tuple[int, str]] = list(zip(positions, brackets))
+
+    if min(positions, default=0) < 0 or min(index, last_string_start, last_string_end) < -1:
+        raise InvalidCheckpoint("the checkpoint is corrupted")
+
+    if checksum(json_string, offset, [*positions, index, last_string_start, last_string_end]) != crc:
+        raise InvalidCheckpoint("the checkpoint does not match the buffer")
+
+    expected = [*stack, (index, char), (last_string_start, '"'), (last_string_end, '"')]
+    for position, token in expected:
+        if token and position != -1 and (position >= offset or json_string[position] != token):
+            raise InvalidCheckpoint(f"expected {token!r} at offset {position} of the buffer")
+
+    state = ScanState()
+    state.stack = stack
+    state.in_string = bool(in_string)
+    state.first_token = first_token
+    state.last_token = index, char
+    state.last_string_start = last_string_start
+    state.last_string_end = last_string_end
+    state.offset = offset
+    return state
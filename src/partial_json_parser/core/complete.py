@@ -1,28 +1,60 @@
-from typing import TYPE_CHECKING, Tuple, Union
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union, overload
 
 from .exceptions import MalformedJSON, PartialJSON
 from .options import *
+from .utf8 import BytesLike, fix_bytes
 
 if TYPE_CHECKING:
     from typing import Literal
 
-CompleteResult = Union[Tuple[int, Union[str, "Literal[True]"]], "Literal[False]"]  # (length, complete_string / already completed) / partial
+CompleteResult = Union[Tuple[int, Union[str, "Literal[True]"]], "Literal[False]"]  # (end index, complete_string / already completed) / partial
 
 
-def fix(json_string: str, allow_partial: Union[Allow, int] = ALL):
+@overload
+def fix(json_string: str, allow_partial: Union[Allow, int] = ALL) -> Tuple[str, str]: ...
+@overload
+def fix(json_string: BytesLike, allow_partial: Union[Allow, int] = ALL) -> Tuple[bytes, bytes]: ...
+
+
+def fix(json_string: Union[str, BytesLike], allow_partial: Union[Allow, int] = ALL):
     """get the original slice and the trailing suffix separately"""
 
-    return _fix(json_string, Allow(allow_partial), True)
+    if not isinstance(json_string, str):
+        return fix_bytes(fix, json_string, allow_partial)
+
+    return _fix(json_string, compile_allow(allow_partial), True)
+
+
+def _fix(json_string: str, allow: Profile, is_top_level=False):
+    index, completion = _cut(json_string, 0, allow, is_top_level)
+    return json_string[:index], completion
+
 
+def _cut(json_string: str, index: int, allow: Profile, is_top_level=False, closer: Optional[str] = None) -> Tuple[int, str]:
+    """
+    complete `json_string[index:]` without slicing it, and get where to cut `json_string` along with the completion
+
+    With a `closer`, `index` is right after a comma of a collection closed by `closer`, whose previous members are left out.
+    """
+
+    end = len(json_string)
+    while end and json_string[end - 1].isspace():  # trailing blanks are stripped before completing
+        end -= 1
+
+    offset = 0
+    if end != len(json_string):  # only the rest is copied, as the engine only looks forward from `index`
+        json_string, offset, index = json_string[index:end], index, 0
 
-def _fix(json_string: str, allow: Allow, is_top_level=False):
     try:
-        result = complete_any(json_string.strip(), allow, is_top_level)
+        if closer is None:
+            result = complete_any(json_string, skip_blank(json_string, index), allow, is_top_level)
+        else:
+            result = complete_collection(json_string, index, allow, closer)
         if result is False:
             raise PartialJSON
 
-        index, completion = result
-        return json_string[:index], ("" if completion is True else completion)
+        end, completion = result
+        return offset + end, ("" if completion is True else completion)
 
     except (AssertionError, IndexError) as err:
         raise MalformedJSON(*err.args) from err
@@ -37,67 +69,82 @@ def skip_blank(text: str, index: int):
     return index
 
 
-def complete_any(json_string: str, allow: Allow, is_top_level=False) -> CompleteResult:
-    i = skip_blank(json_string, 0)
-    char = json_string[i]
+def is_escaped(text: str, index: int):
+    """whether the character at `index` follows an odd run of backslashes"""
 
-    if char == '"':
-        return complete_str(json_string, allow)
+    start = index
+    while index and text[index - 1] == "\\":
+        index -= 1
+    return (start - index) % 2
 
-    if char in "1234567890":
-        return complete_num(json_string, allow, is_top_level)
 
-    if char == "[":
-        return complete_arr(json_string, allow)
+def is_prefix_of(literal: str, text: str, index: int):
+    """whether `text[index:]` is a prefix of `literal`, without slicing the (possibly long) rest of `text`"""
+
+    return len(text) - index <= len(literal) and literal.startswith(text[index:])
 
-    if char == "{":
-        return complete_obj(json_string, allow)
 
-    if json_string.startswith("null"):
-        return (4, True)
-    if "null".startswith(json_string):
-        return (0, "null") if NULL in allow else False
+def complete_any(json_string: str, index: int, allow: Profile, is_top_level=False) -> CompleteResult:
+    if json_string[index] in "[{":
+        return complete_collection(json_string, index, allow)
 
-    if json_string.startswith("true"):
-        return (4, True)
-    if "true".startswith(json_string):
-        return (0, "true") if BOOL in allow else False
+    return complete_atom(json_string, index, allow, is_top_level)
 
-    if json_string.startswith("false"):
-        return (5, True)
-    if "false".startswith(json_string):
-        return (0, "false") if BOOL in allow else False
 
-    if json_string.startswith("Infinity"):
-        return (8, True)
-    if "Infinity".startswith(json_string):
-        return (0, "Infinity") if INFINITY in allow else False
+def complete_atom(json_string: str, index: int, allow: Profile, is_top_level=False) -> CompleteResult:
+    char = json_string[index]
+
+    if char == '"':
+        return complete_str(json_string, index, allow)
+
+    if char in "1234567890":
+        return complete_num(json_string, index, allow, is_top_level)
+
+    if json_string.startswith("null", index):
+        return (index + 4, True)
+    if is_prefix_of("null", json_string, index):
+        return (index, "null") if allow.NULL else False
+
+    if json_string.startswith("true", index):
+        return (index + 4, True)
+    if is_prefix_of("true", json_string, index):
+        return (index, "true") if allow.BOOL else False
+
+    if json_string.startswith("false", index):
+        return (index + 5, True)
+    if is_prefix_of("false", json_string, index):
+        return (index, "false") if allow.BOOL else False
+
+    if json_string.startswith("Infinity", index):
+        return (index + 8, True)
+    if is_prefix_of("Infinity", json_string, index):
+        return (index, "Infinity") if allow.INFINITY else False
 
     if char == "-":
-        if len(json_string) == 1:
+        if index + 1 == len(json_string):
             return False
-        elif json_string[1] != "I":
-            return complete_num(json_string, allow, is_top_level)
+        elif json_string[index + 1] != "I":
+            return complete_num(json_string, index, allow, is_top_level)
 
-    if json_string.startswith("-Infinity"):
-        return (9, True)
-    if "-Infinity".startswith(json_string):
-        return (0, "-Infinity") if _INFINITY in allow else False
+    if json_string.startswith("-Infinity", index):
+        return (index + 9, True)
+    if is_prefix_of("-Infinity", json_string, index):
+        return (index, "-Infinity") if allow._INFINITY else False
 
-    if json_string.startswith("NaN"):
-        return (3, True)
-    if "NaN".startswith(json_string):
-        return (0, "NaN") if NAN in allow else False
+    if json_string.startswith("NaN", index):
+        return (index + 3, True)
+    if is_prefix_of("NaN", json_string, index):
+        return (index, "NaN") if allow.NAN else False
 
     raise MalformedJSON(f"Unexpected character {char}")
 
 
-def complete_str(json_string: str, allow: Allow) -> CompleteResult:
-    assert json_string[0] == '"'
+def complete_str(json_string: str, index: int, allow: Profile) -> CompleteResult:
+    assert json_string[index] == '"'
 
     length = len(json_string)
 
-    i = 1
+    i = index + 1
 
     try:
         while True:
@@ -114,111 +161,154 @@ def complete_str(json_string: str, allow: Allow) -> CompleteResult:
             i += 1
 
     except IndexError:
-        if STR not in allow:
+        if not allow.STR:
             return False
 
-        def not_escaped(index: int):
-            text_before = json_string[:index]
-            count = index - len(text_before.rstrip("\\"))
-            return count % 2 == 0
+        return cut_partial_escape(json_string, index, i), '"'
 
-        # \uXXXX
-        _u = json_string.rfind("\\u", max(0, i - 5), i)
-        if _u != -1 and not_escaped(_u):
-            return _u, '"'
 
-        # \UXXXXXXXX
-        _U = json_string.rfind("\\U", max(0, i - 9), i)
-        if _U != -1 and not_escaped(_U):
-            return _U, '"'
+def cut_open_str(json_string: str, index: int):
+    """
+    where to cut the string opened at `index`, which is known to run until the end of `json_string`
 
-        # \xXX
-        _x = json_string.rfind("\\x", max(0, i - 3), i)
-        if _x != -1 and not_escaped(_x):
-            return _x, '"'
+    This is the same as `complete_str` on an unterminated string, without walking through its content.
+    """
 
-        return i, '"'
+    end = len(json_string)
+    while json_string[end - 1].isspace():  # trailing blanks are stripped before completing
+        end -= 1
 
+    if is_escaped(json_string, end):  # a lone backslash at the end
+        end -= 1
 
-def complete_arr(json_string: str, allow: Allow) -> CompleteResult:
-    assert json_string[0] == "["
-    i = j = 1
+    return cut_partial_escape(json_string, index, end)
 
-    try:
-        while True:
-            j = skip_blank(json_string, j)
 
-            if json_string[j] == "]":
-                return j + 1, True
+def cut_partial_escape(json_string: str, index: int, i: int):
+    """where to cut the string opened at `index` and truncated at `i`, so that it does not end in the middle of an escape sequence"""
 
-            result = complete_any(json_string[j:], allow)
+    # \uXXXX
+    _u = json_string.rfind("\\u", max(index, i - 5), i)
+    if _u != -1 and not is_escaped(json_string, _u):
+        return _u
 
-            if result is False:  # incomplete
-                return (i, "]") if ARR in allow else False
-            if result[1] is True:  # complete
-                i = j = j + result[0]
-            else:  # incomplete
-                return (j + result[0], result[1] + "]") if ARR in allow else False
+    # \UXXXXXXXX
+    _U = json_string.rfind("\\U", max(index, i - 9), i)
+    if _U != -1 and not is_escaped(json_string, _U):
+        return _U
 
-            j = skip_blank(json_string, j)
+    # \xXX
+    _x = json_string.rfind("\\x", max(index, i - 3), i)
+    if _x != -1 and not is_escaped(json_string, _x):
+        return _x
 
-            if json_string[j] == ",":
-                j += 1
-            elif json_string[j] == "]":
-                return j + 1, True
-            else:
-                raise MalformedJSON(f"Expected ',' or ']', got {json_string[j]}")
-    except IndexError:
-        return (i, "]") if ARR in allow else False
+    return i
 
 
-def complete_obj(json_string: str, allow: Allow) -> CompleteResult:
-    assert json_string[0] == "{"
-    i = j = 1
+def complete_collection(json_string: str, index: int, allow: Profile, closer: Optional[str] = None) -> CompleteResult:
+    """
+    complete the array or object at `index`, or its members from `index` on if its `closer` is given
+
+    Nested collections are kept on an explicit stack instead of the call stack, so any depth can be completed.
+    """
+
+    closers: List[str] = []  # the closing character of each open collection
+    ends: List[int] = []  # the end of the last complete member of each open collection
+    j = index
+
+    while True:
+        if closer is None:
+            # `j` is at the opening character of a collection
+            closer = "]" if json_string[j] == "[" else "}"
+            j += 1
+        closers.append(closer)
+        ends.append(j)
+        after_member = False
 
-    try:
         while True:
-            j = skip_blank(json_string, j)
+            try:
+                # complete atomic members until the collection ends or a nested one starts
+                while True:
+                    if after_member:
+                        j = skip_blank(json_string, j)
 
-            if json_string[j] == "}":
-                return j + 1, True
+                        if json_string[j] == ",":
+                            j += 1
+                        elif json_string[j] == closer:
+                            break
+                        else:
+                            raise MalformedJSON(f"Expected ',' or '{closer}', got {json_string[j]}")
 
-            result = complete_str(json_string[j:], allow)
-            if result and result[1] is True:  # complete
-                j += result[0]
-            else:  # incomplete
-                return (i, "}") if OBJ in allow else False
+                    j = skip_blank(json_string, j)
 
-            j = skip_blank(json_string, j)
+                    if json_string[j] == closer:
+                        break
 
-            if json_string[j] != ":":
-                raise MalformedJSON(f"Expected ':', got {json_string[j]}")
-            j += 1
+                    if closer == "}":
+                        result = complete_str(json_string, j, allow)
+                        if not result or result[1] is not True:  # incomplete
+                            return close_collections(False, closers, ends, allow)
+
+                        j = skip_blank(json_string, result[0])
+
+                        if json_string[j] != ":":
+                            raise MalformedJSON(f"Expected ':', got {json_string[j]}")
+
+                        j = skip_blank(json_string, j + 1)
 
-            j = skip_blank(json_string, j)
+                    if json_string[j] in "[{":
+                        break
 
-            result = complete_any(json_string[j:], allow)
-            if result is False:  # incomplete
-                return (i, "}") if OBJ in allow else False
-            if result[1] is True:  # complete
-                i = j = j + result[0]
-            else:  # incomplete
-                return (j + result[0], result[1] + "}") if OBJ in allow else False
+                    result = complete_atom(json_string, j, allow)
+                    if result is False or result[1] is not True:  # incomplete
+                        return close_collections(result, closers, ends, allow)
 
-            j = skip_blank(json_string, j)
+                    j = ends[-1] = result[0]
+                    after_member = True
 
-            if json_string[j] == ",":
-                j += 1
-            elif json_string[j] == "}":
+            except IndexError:
+                return close_collections(False, closers, ends, allow)
+
+            if json_string[j] != closer:
+                closer = None
+                break  # open the nested collection
+
+            # the innermost collection is complete, so it is a complete member of its parent
+            closers.pop()
+            ends.pop()
+
+            if not closers:
                 return j + 1, True
-            else:
-                raise MalformedJSON(f"Expected ',' or '}}', got {json_string[j]}")
-    except IndexError:
-        return (i, "}") if OBJ in allow else False
+
+            closer = closers[-1]
+            j = ends[-1] = j + 1
+            after_member = True
+
+
+def close_collections(result: CompleteResult, closers: List[str], ends: List[int], allow: Profile) -> CompleteResult:
+    """complete the open collections, given the incomplete `result` of the last member of the innermost one"""
+
+    if result is False:
+        end: Optional[int] = None
+        completion: List[str] = []
+    else:
+        end, tail = result
+        assert tail is not True
+        completion = [tail]
+
+    for closer, last in zip(reversed(closers), reversed(ends)):
+        if not (allow.ARR if closer == "]" else allow.OBJ):
+            end = None
+        elif end is None:
+            end, completion = last, [closer]
+        else:
+            completion.append(closer)
+
+    return False if end is None else (end, "".join(completion))
 
 
-def complete_num(json_string: str, allow: Allow, is_top_level=False) -> CompleteResult:
-    i = 1
+def complete_num(json_string: str, index: int, allow: Profile, is_top_level=False) -> CompleteResult:
+    i = index + 1
     length = len(json_string)
 
     # forward
@@ -231,8 +321,10 @@ def complete_num(json_string: str, allow: Allow, is_top_level=False) -> Complete
     while json_string[i - 1] in ".-+eE":
         modified = True
         i -= 1
+        if i == index:  # no digit at all
+            raise IndexError("string index out of range")
 
     if modified or i == length and not is_top_level:
-        return (i, "") if NUM in allow else False
+        return (i, "") if allow.NUM else False
     else:
         return i, True
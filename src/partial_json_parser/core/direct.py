@@ -0,0 +1,143 @@
+from json import loads
+from typing import Dict, List, Tuple, Union
+
+from . import myelin
+from .api import JSON
+from .complete import is_escaped
+from .incremental import raw_decode, skip_whitespace
+from .myelin import ScanState, cut_scanned, join_closing_tokens
+from .options import *
+from .utf8 import BytesLike, complete_utf8_length
+
+LARGE = 4096  # members at least this long are decoded in place, and shorter ones in bulk
+
+
+def decode_large_members(json_string: str, cursor: int, char: str, limit: int):
+    """
+    decode the members after `cursor` in place as long as they are large and followed by a comma before `limit`
+
+    Returns the decoded members and where the rest of them start. A member after the last comma before `limit` cannot be finished,
+    so it is not decoded, as failing to decode it would count the lines of the whole string for the error message.
+    """
+
+    items: Union[List[JSON], Dict[str, JSON]] = [] if char == "[" else {}
+    last_comma = json_string.rfind(",", cursor, limit)
+
+    try:
+        while True:
+            i = skip_whitespace(json_string, cursor)
+            if i > last_comma:
+                break
+
+            if isinstance(items, dict):
+                if json_string[i] != '"':
+                    break
+                key, i = raw_decode(json_string, i)
+                i = skip_whitespace(json_string, i)
+                if json_string[i] != ":":
+                    break
+                i = skip_whitespace(json_string, i + 1)
+
+            if i >= limit:  # the open member of a parent
+                break
+
+            value, end = raw_decode(json_string, i)
+
+            separator = skip_whitespace(json_string, end)
+            if separator >= limit or json_string[separator] != ",":
+                break
+
+            if isinstance(items, dict):
+                items[key] = value
+            else:
+                items.append(value)
+
+            cursor = separator + 1
+
+            if end - i < LARGE:
+                break
+
+    except (ValueError, IndexError):  # the member is partial
+        pass
+
+    return items, cursor
+
+
+def decode_innermost(json_string: str, start: int, char: str, cut: int, completion: str, limit: int) -> JSON:
+    """decode the innermost open container, whose last member is completed with `completion` and does not start before `limit`"""
+
+    items, cursor = decode_large_members(json_string, start + 1, char, limit)
+    closer = "]" if char == "[" else "}"
+
+    rest = loads("".join((char, json_string[cursor:cut], completion, closer)))
+
+    return {**items, **rest} if isinstance(items, dict) else items + rest
+
+
+def decode_parent(json_string: str, start: int, char: str, child_start: int, child: JSON) -> JSON:
+    """decode an open container whose last member is the open container at `child_start`, which is decoded as `child`"""
+
+    items, cursor = decode_large_members(json_string, start + 1, char, child_start)
+    closer = "]" if char == "[" else "}"
+
+    member_start = child_start
+    if char == "{":
+        colon = json_string.rfind(":", cursor, child_start)
+        member_start = json_string.rfind('"', cursor, colon)
+        member_start = json_string.rfind('"', cursor, member_start)
+        while member_start > 0 and is_escaped(json_string, member_start):
+            member_start = json_string.rfind('"', cursor, member_start)
+
+    separator = json_string.rfind(",", cursor, member_start)
+    rest = loads("".join((char, json_string[cursor:separator], closer))) if separator != -1 else {} if char == "{" else []
+
+    if isinstance(items, dict):
+        assert isinstance(rest, dict)
+        key = raw_decode(json_string, member_start)[0]
+        return {**items, **rest, key: child}
+
+    assert isinstance(rest, list)
+    return items + rest + [child]
+
+
+def parse_direct(json_string: Union[str, BytesLike], allow_partial: Union[Allow, int] = ALL) -> JSON:
+    """
+    the same as `parse_json(json_string)`, but decoding the original string instead of a completed copy of it
+
+    The open containers are rebuilt from the scan state of `fix_fast`. Their large members are decoded in place,
+    so that only the small members and the partial last member are copied.
+    """
+
+    if not isinstance(json_string, str):
+        data = bytes(json_string)
+        json_string = data[: complete_utf8_length(data)].decode()
+
+    if myelin.prefix_cache is None:
+        state = ScanState()
+        state.scan(json_string)
+    else:
+        state = myelin.prefix_cache.scan(json_string)
+
+    cut, tail = cut_scanned(json_string, state, compile_allow(allow_partial))
+    opened: List[Tuple[int, str]] = []
+    for start, char in state.stack:
+        if start >= cut:
+            break
+        opened.append((start, char))
+
+    if not opened or not tail.endswith(join_closing_tokens(opened)):
+        return loads(json_string[:cut] + tail)
+
+    try:
+        start, char = opened[-1]
+        limit = min(cut, state.last_string_start) if state.in_string else cut  # never try to decode the open string
+        value = decode_innermost(json_string, start, char, cut, tail[: len(tail) - len(opened)], limit)
+
+        for index in reversed(range(len(opened) - 1)):
+            start, char = opened[index]
+            value = decode_parent(json_string, start, char, opened[index + 1][0], value)
+
+        return value
+
+    except (ValueError, IndexError, AssertionError):  # not valid JSON, which `fix_fast` may tolerate
+        return loads(json_string[:cut] + tail)
@@ -0,0 +1,82 @@
+from time import perf_counter
+from typing import Callable, Iterable, Optional, Union
+
+from .complete import fix
+from .myelin import fix_fast
+from .options import *
+from .utf8 import BytesLike
+
+closing_chars = {"{": "}", "[": "]", '"': '"', b"{": b"}", b"[": b"]", b'"': b'"'}
+
+
+class Dispatcher:
+    """
+    Choose the cheapest way to complete an input from its size and its first and last characters
+
+    - inputs which look complete (their last character closes their first one) are tried with the parser first
+    - inputs shorter than `small_size` are completed by `fix`, whose constant overhead is lower
+    - other inputs are completed by `fix_fast`
+    """
+
+    def __init__(self, small_size=64, try_complete=True):
+        self.small_size = small_size
+        self.try_complete = try_complete
+
+    def fix(self, json_string: Union[str, BytesLike], allow_partial: Union[Allow, int] = ALL):
+        if len(json_string) < self.small_size:
+            return fix(json_string, allow_partial)
+        return fix_fast(json_string, allow_partial)
+
+    def ensure_json(self, json_string: Union[str, BytesLike], allow_partial: Union[Allow, int] = ALL):
+        head, tail = self.fix(json_string, allow_partial)
+        return head + tail  # type: ignore  # both are str or both are bytes
+
+    def looks_complete(self, json_string: Union[str, bytes]):
+        return closing_chars.get(json_string.lstrip()[:1]) == json_string.rstrip()[-1:]  # type: ignore
+
+    def parse_json(self, json_string: Union[str, BytesLike], allow_partial: Union[Allow, int] = ALL, parser: Optional[Callable] = None):
+        if parser is None:
+            from json import loads as parser
+
+        if not isinstance(json_string, str):
+            json_string = bytes(json_string)
+
+        if self.try_complete and self.looks_complete(json_string):
+            try:
+                return parser(json_string)
+            except ValueError:
+                pass
+
+        return parser(self.ensure_json(json_string, allow_partial))
+
+    def calibrate(self, samples: Iterable[str], allow_partial: Union[Allow, int] = ALL, number=10):
+        """set `small_size` to the size which minimizes the total time of completing `samples`"""
+
+        timings = []
+        for json_string in samples:
+            try:
+                costs = []
+                for fixer in (fix, fix_fast):
+                    start = perf_counter()
+                    for _ in range(number):
+                        fixer(json_string, allow_partial)
+                    costs.append(perf_counter() - start)
+            except ValueError:  # PartialJSON or MalformedJSON
+                continue
+            timings.append((len(json_string), *costs))
+
+        timings.sort()
+
+        # the total time if every sample shorter than the threshold uses `fix` and the rest use `fix_fast`
+        best_size = 0
+        best_cost = total = sum(fast for _, _, fast in timings)
+        for size, slow, fast in timings:
+            total += slow - fast
+            if total < best_cost:
+                best_size, best_cost = size + 1, total
+
+        self.small_size = best_size
+        return best_size
+
+
+dispatcher = Dispatcher()
@@ -0,0 +1,250 @@
+from codecs import getincrementaldecoder
+from json import loads
+from re import compile
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .api import JSON
+from .complete import _fix, cut_partial_escape, is_escaped
+from .exceptions import MalformedJSON, PartialJSON
+from .incremental import raw_decode, skip_whitespace
+from .myelin import match_string_rest
+from .options import *
+from .utf8 import BytesLike
+
+match_atom = compile(r'[^ \t\n\r,:\[\]{}"]+').match
+match_high_surrogate = compile(r"\\u[dD][89abAB][0-9a-fA-F]{2}").match
+
+Event = Tuple[str, Any]
+
+# what the next token may be
+VALUE = 0  # a value
+FIRST_VALUE = 1  # a value or the end of the array
+KEY = 2  # a key
+FIRST_KEY = 3  # a key or the end of the object
+COLON = 4
+COMMA = 5  # a comma or the end of the container
+DONE = 6  # nothing, as the top-level value is complete
+
+starts = {"[": ("start_array", FIRST_VALUE), "{": ("start_object", FIRST_KEY)}
+ends = {"]": ("end_array", "[", FIRST_VALUE), "}": ("end_object", "{", FIRST_KEY)}
+
+
+def decode(json_string: str, index: int):
+    try:
+        return raw_decode(json_string, index)
+    except ValueError as err:
+        raise MalformedJSON(*err.args) from err
+
+
+def decode_segment(segment: str) -> str:
+    """decode a part of the content of a string literal, which must not cut an escape sequence"""
+
+    try:
+        return loads(f'"{segment}"')
+    except ValueError as err:
+        raise MalformedJSON(*err.args) from err
+
+
+class EventParser:
+    """
+    Turn the chunks of a (partial) JSON string into events as they arrive
+
+    Events are `(name, value)` pairs, whose value is `None` unless stated otherwise:
+
+    - `start_object`, `end_object`, `start_array` and `end_array`
+    - `key` with the key, right before the first event of its value
+    - `value` with a string, number, boolean, null, NaN or Infinity
+    - `partial_string` with the decoded prefix of a string value which is still open at the end of a chunk, if `STR` is allowed
+
+    With `deltas`, `partial_string` events are replaced by `string_delta` events, whose value is a `(path, text)` pair of the path of a string value
+    and its characters decoded since the previous delta. The deltas of a string value add up to the whole string, and precede its `value` event.
+
+    The consumed input is discarded, so the memory used is proportional to the nesting depth plus the size of the current token.
+    """
+
+    def __init__(self, allow_partial: Union[Allow, int] = ALL, deltas=False):
+        self.allow = compile_allow(allow_partial)
+        self.deltas = deltas
+        self.buffer = ""  # the unconsumed input, which starts with the current token
+        self.stack: List[str] = []  # the opening character of each open container
+        self.path: List[Union[str, int]] = []  # the key or the index of the current member of each open container
+        self.sent = 0  # how many characters of the open string literal have been sent as deltas
+        self.expecting = VALUE
+        self.key: Optional[str] = None  # the key whose value has not started yet
+        self.resume = 0  # where to resume matching the open string at the start of the buffer
+        self.decoder = getincrementaldecoder("utf-8")()
+
+    def feed(self, chunk: Union[str, BytesLike]) -> List[Event]:
+        """consume `chunk` and get the events of the tokens it completes"""
+
+        if not isinstance(chunk, str):
+            chunk = self.decoder.decode(chunk)
+
+        buffer = self.buffer
+        self.buffer = ""  # so that the concatenation below may happen in place
+        buffer += chunk
+        length = len(buffer)
+        events: List[Event] = []
+        i = 0
+
+        while True:
+            i = skip_whitespace(buffer, i)
+            if i == length:
+                break
+
+            char = buffer[i]
+            expecting = self.expecting
+
+            if char == '"':
+                self.check(expecting in (VALUE, FIRST_VALUE, KEY, FIRST_KEY), char)
+                match = match_string_rest(buffer, self.resume or i + 1)
+                assert match is not None  # always matches
+
+                if not match.group(1):  # the string is not terminated yet
+                    self.resume = match.end() - i
+                    if expecting in (VALUE, FIRST_VALUE) and self.allow.STR:
+                        self.emit_key(events)
+                        if self.deltas:
+                            end = cut_partial_escape(buffer, i, match.end())
+                            surrogate = match_high_surrogate(buffer, end - 6) if end - i > 6 else None
+                            if surrogate and not is_escaped(buffer, end - 6):  # the low surrogate may follow
+                                end -= 6
+                            self.emit_delta(events, buffer, i, end)
+                        else:
+                            end = cut_partial_escape(buffer, i, match.end())
+                            events.append(("partial_string", decode_segment(buffer[i + 1 : end])))
+                    break
+
+                self.resume = 0
+                if self.deltas and expecting in (VALUE, FIRST_VALUE):
+                    self.emit_key(events)
+                    self.emit_delta(events, buffer, i, match.end() - 1)
+                    self.sent = 0
+                string, i = decode(buffer, i)
+
+                if expecting in (KEY, FIRST_KEY):
+                    self.key = self.path[-1] = string
+                    self.expecting = COLON
+                else:
+                    self.emit_value(events, string)
+
+            elif char in starts:
+                self.check(expecting in (VALUE, FIRST_VALUE), char)
+                name, self.expecting = starts[char]
+                self.emit_key(events)
+                events.append((name, None))
+                self.stack.append(char)
+                self.path.append(0 if char == "[" else "")
+                i += 1
+
+            elif char in ends:
+                name, opening, first = ends[char]
+                self.check(bool(self.stack) and self.stack[-1] == opening and expecting in (COMMA, first), char)
+                self.stack.pop()
+                self.path.pop()
+                events.append((name, None))
+                self.expecting = COMMA if self.stack else DONE
+                i += 1
+
+            elif char == ",":
+                self.check(expecting == COMMA, char)
+                if self.stack[-1] == "[":
+                    self.expecting = VALUE
+                    self.path[-1] += 1  # type: ignore  # an index
+                else:
+                    self.expecting = KEY
+                i += 1
+
+            elif char == ":":
+                self.check(expecting == COLON, char)
+                self.expecting = VALUE
+                i += 1
+
+            else:
+                match = match_atom(buffer, i)
+                assert match is not None  # `char` is neither blank nor structural
+
+                if skip_whitespace(buffer, match.end()) == length:  # it may continue in the next chunk, and trailing blanks are stripped
+                    break
+
+                self.check(expecting in (VALUE, FIRST_VALUE), char)
+                value, end = decode(buffer, i)
+                self.check(end == match.end(), char)
+                self.emit_value(events, value)
+                i = end
+
+        self.buffer = buffer[i:]
+        return events
+
+    def close(self) -> List[Event]:
+        """
+        end the input, and get the events of its partial value
+
+        The incomplete value at the end is emitted only if it is allowed, like `parse_json` does.
+        The open containers are then closed. Their start events have already been emitted, so `PartialJSON` is raised if they are not allowed.
+        """
+
+        events: List[Event] = []
+        buffer = self.buffer
+
+        if buffer and self.expecting in (VALUE, FIRST_VALUE):
+            try:
+                head, tail = _fix(buffer, self.allow, not self.stack)
+            except PartialJSON:
+                if not self.stack:
+                    raise
+            else:
+                if self.deltas and buffer[0] == '"':
+                    self.emit_key(events)
+                    self.emit_delta(events, buffer, 0, len(head))
+                self.emit_value(events, loads(head + tail))
+
+        elif buffer and self.expecting not in (KEY, FIRST_KEY):  # a partial key is dropped along with its member
+            raise MalformedJSON(f"Unexpected character {buffer[0]}")
+
+        elif self.expecting == VALUE and not self.stack:
+            raise PartialJSON("the input is empty")
+
+        self.key = None
+
+        while self.stack:
+            char = self.stack.pop()
+            self.path.pop()
+            if not (self.allow.ARR if char == "[" else self.allow.OBJ):
+                raise PartialJSON(f"the {'array' if char == '[' else 'object'} is not complete")
+            events.append(("end_array" if char == "[" else "end_object", None))
+
+        self.buffer = ""
+        self.expecting = DONE
+        return events
+
+    def emit_key(self, events: List[Event]):
+        if self.key is not None:
+            events.append(("key", self.key))
+            self.key = None
+
+    def emit_delta(self, events: List[Event], buffer: str, start: int, end: int):
+        """emit the content of the string literal at `start` which is new since the previous delta, until `end`"""
+
+        text = decode_segment(buffer[start + 1 + self.sent : end])
+        self.sent = end - start - 1
+        if text:
+            events.append(("string_delta", (tuple(self.path), text)))
+
+    def emit_value(self, events: List[Event], value: JSON):
+        self.emit_key(events)
+        events.append(("value", value))
+        self.expecting = COMMA if self.stack else DONE
+
+    def check(self, expected: bool, char: str):
+        if not expected:
+            raise MalformedJSON(f"Unexpected character {char}")
+
+
+def parse_events(chunks: Iterable[Union[str, BytesLike]], allow_partial: Union[Allow, int] = ALL, deltas=False) -> Iterator[Event]:
+    """turn an iterable of chunks into an iterator of events, see `EventParser`"""
+
+    parser = EventParser(allow_partial, deltas)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
@@ -8,3 +8,7 @@ class PartialJSON(JSONDecodeError):
 
 class MalformedJSON(JSONDecodeError):
     pass
+
+
+class InvalidCheckpoint(ValueError):
+    pass
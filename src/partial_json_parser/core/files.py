@@ -0,0 +1,299 @@
+from mmap import ACCESS_READ, mmap
+from os import PathLike
+from re import compile
+from typing import List, Optional, Tuple, Union
+
+from .exceptions import MalformedJSON
+from .myelin import ScanState, cut_scanned
+from .options import *
+from .utf8 import complete_utf8_length
+
+StrPath = Union[str, "PathLike[str]"]
+
+BLOCK_SIZE = 2**20  # how many bytes are scanned at a time
+BISECT_SIZE = 4096  # below which a part of a block is scanned token by token to locate its open brackets
+
+find_structural = compile(rb'["\[\]{}]').finditer
+match_string_rest = compile(rb'[^"\\]*(?:\\[\s\S][^"\\]*)*("?)').match
+search_first_token = compile(rb'[\[\]{}"]').search
+fullmatch_reduced = compile(rb"[\]}]*[\[{]*").fullmatch
+
+not_structural = bytes(sorted(set(range(256)) - set(b'[]{}"')))
+openers = {ord("["): "[", ord("{"): "{"}
+closers = {ord("]"): "[", ord("}"): "{"}
+
+
+def read_neutralized(data: mmap, start: int, end: int):
+    """
+    read the bytes of a region which starts outside of any string, with its escaped backslashes and quotes replaced by underscores
+
+    Positions are kept, and every remaining quote starts or ends a string. Replacing the pairs of backslashes first leaves
+    exactly the backslashes which escape the next character, so that the escaped quotes are the ones still preceded by one.
+    """
+
+    block = data[start:end]
+    return block.replace(b"\\\\", b"__").replace(b'\\"', b"__") if b"\\" in block else block
+
+
+class MappedText:
+    """
+    The bytes of a mapped file, duck-typed as the `str` they decode to with `surrogateescape`, so that the fast engine can run on them
+
+    Only what the engine needs is implemented, and characters are only decoded where it looks.
+    """
+
+    __slots__ = ("data", "length")
+
+    def __init__(self, data: mmap, length: int):
+        self.data = data
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.data[slice(*index.indices(self.length))].decode("ascii", "surrogateescape")
+        if not 0 <= index < self.length:
+            raise IndexError("string index out of range")
+        byte = self.data[index]
+        return chr(byte) if byte < 0x80 else chr(0xDC00 + byte)
+
+    def find(self, sub: str, start: Optional[int] = None, end: Optional[int] = None):
+        return self.data.find(sub.encode(), start or 0, self.length if end is None else min(end, self.length))
+
+    def rfind(self, sub: str, start: Optional[int] = None, end: Optional[int] = None):
+        return self.data.rfind(sub.encode(), start or 0, self.length if end is None else min(end, self.length))
+
+    def startswith(self, prefix: str, start=0):
+        return start + len(prefix) <= self.length and self.data[start : start + len(prefix)] == prefix.encode()
+
+
+def reduce_brackets(brackets: bytes):
+    """cancel the matching pairs out of a sequence of brackets, leaving the unmatched closing brackets followed by the unmatched opening ones"""
+
+    for _ in range(64):
+        reduced = brackets.replace(b"[]", b"").replace(b"{}", b"")
+        if len(reduced) == len(brackets):
+            break
+        brackets = reduced
+    else:  # deeply nested, so cancel them one by one instead
+        stack = bytearray()
+        for byte in brackets:
+            if stack and byte in closers and stack[-1] == ord(closers[byte]):
+                stack.pop()
+            else:
+                stack.append(byte)
+        brackets = bytes(stack)
+
+    if fullmatch_reduced(brackets) is None:
+        raise MalformedJSON("mismatched brackets")
+
+    return brackets
+
+
+def bracket_sequence(block: bytes, start: int, end: int):
+    """the unmatched brackets of `block[start:end]` outside of strings, where `block` is neutralized and starts outside of any string"""
+
+    sequence = block[start:end].translate(None, not_structural)
+    if block.count(b'"', 0, start) % 2:  # it starts inside a string
+        sequence = b'"' + sequence
+
+    # removing adjacent quotes keeps whether each bracket is inside a string, so only the strings containing brackets are left
+    sequence = sequence.replace(b'""', b"")
+    if b'"' in sequence:
+        sequence = b"".join(sequence.split(b'"')[0::2])
+
+    return reduce_brackets(sequence)
+
+
+def locate_openers(block: bytes, start: int, end: int) -> List[int]:
+    """the positions of the unmatched opening brackets of `block[start:end]`, found by bisecting it down to small parts"""
+
+    if end - start <= BISECT_SIZE:
+        opened: List[int] = []
+        in_string = block.count(b'"', 0, start) % 2
+        for match in find_structural(block, start, end):
+            byte = block[match.start()]
+            if byte == ord('"'):
+                in_string = not in_string
+            elif in_string:
+                continue
+            elif byte in openers:
+                opened.append(match.start())
+            elif opened:
+                opened.pop()
+        return opened
+
+    middle = (start + end) // 2
+    left = bracket_sequence(block, start, middle)
+    right = bracket_sequence(block, middle, end)
+
+    closing = len(right) - len(right.lstrip(b"]}"))
+    left_opening = len(left.lstrip(b"]}"))
+
+    opened = locate_openers(block, middle, end) if closing < len(right) else []
+    if left_opening > closing:
+        opened = locate_openers(block, start, middle)[: left_opening - closing] + opened
+    return opened
+
+
+def find_last_tokens(data: mmap, start: int, end: int):
+    """the last structural token and the bounds of the last string of a region which starts and ends outside of any string"""
+
+    block = read_neutralized(data, start, end)
+
+    last_quote = block.rfind(b'"')
+    last_string = (-1, -1) if last_quote == -1 else (start + block.rfind(b'"', 0, last_quote), start + last_quote)
+
+    # the brackets after the last string are outside of any string
+    last_bracket = max(block.rfind(bracket, last_quote + 1) for bracket in (b"[", b"]", b"{", b"}"))
+
+    if last_bracket != -1:
+        return (start + last_bracket, chr(block[last_bracket])), last_string
+    if last_quote != -1:
+        return (start + last_quote, '"'), last_string
+    return (-1, ""), last_string
+
+
+def scan_mapped(data: mmap, length: int):
+    """
+    get the same `ScanState` as scanning `data[:length]` decoded would give
+
+    The file is processed in blocks, whose strings and matching brackets are cancelled out by bytes methods instead of a loop over the tokens.
+    The open brackets are then located by bisecting the blocks they are in, and the last tokens are searched backwards from the end.
+    """
+
+    state = ScanState()
+    state.offset = length
+
+    match = search_first_token(data, 0, length)
+    if match is None:
+        return state
+
+    state.first_token = chr(data[match.start()])
+    if state.first_token == '"':  # top-level string, left to the slow engine
+        return state
+
+    stack: List[Tuple[int, int, str]] = []  # the region and the rank among its unmatched opening brackets of each open container
+    segments: List[Tuple[int, int, Optional[bool]]] = []  # regions outside of strings, and strings spanning past a block with whether they are closed
+
+    position = match.start()
+
+    while position < length:
+        end = min(position + BLOCK_SIZE, length)
+        while end < length and data[end - 1] == ord("\\"):  # do not split an escape sequence
+            end += 1
+
+        block = read_neutralized(data, position, end)
+        region_end = end
+        string = None
+
+        if block.count(b'"') % 2:  # a string continues past the block
+            region_end = position + block.rfind(b'"')
+            rest = match_string_rest(data, region_end + 1, length)
+            assert rest is not None  # always matches, maybe an empty string
+            if rest.group(1):
+                string = region_end, rest.end(), True
+            else:  # it is still open at the end
+                string = region_end, length, False
+                state.offset = rest.end()  # where `ScanState.scan` would resume
+
+        rank = 0
+        for byte in bracket_sequence(block, 0, region_end - position):
+            if byte in closers:
+                if not stack or stack[-1][2] != closers[byte]:
+                    raise MalformedJSON(f"Unexpected character {chr(byte)}")
+                stack.pop()
+            else:
+                stack.append((len(segments), rank, openers[byte]))
+                rank += 1
+
+        segments.append((position, region_end, None))
+        if string is not None:
+            segments.append(string)
+
+        position = end if string is None else string[1]
+
+    # locate the open containers
+
+    located = {}
+    for index in {index for index, _, _ in stack}:
+        start, end, _ = segments[index]
+        located[index] = [start + i for i in locate_openers(read_neutralized(data, start, end), 0, end - start)]
+
+    state.stack = [(located[index][rank], char) for index, rank, char in stack]
+
+    # find the last token and the last strings, from the end
+
+    state.in_string = segments[-1][2] is False  # only the last string can be open
+    last_token: Optional[Tuple[int, str]] = None
+    last_string_start: Optional[int] = None
+
+    for start, end, closed in reversed(segments):
+        if closed is None:
+            token, (string_start, string_end) = find_last_tokens(data, start, end)
+        else:
+            token = (end - 1, '"') if closed else (start, '"')
+            string_start, string_end = start, (end - 1 if closed else -1)
+
+        if last_token is None and token[0] != -1:
+            last_token = token
+        if last_string_start is None and string_start != -1:
+            last_string_start = string_start
+        if string_end != -1:
+            state.last_string_end = string_end
+            break
+
+    state.last_token = last_token or (-1, "")
+    state.last_string_start = -1 if last_string_start is None else last_string_start
+
+    return state
+
+
+def fix_file(path: StrPath, allow_partial: Union[Allow, int] = ALL) -> Tuple[int, bytes]:
+    """
+    work out how to complete a (truncated) JSON file without reading it into memory
+
+    Returns the size to truncate the file to and the bytes to append, like `fix_fast` does for its content.
+    """
+
+    with open(path, "rb") as file:
+        size = file.seek(0, 2)
+        if size == 0:
+            cut, tail = cut_scanned("", ScanState(), compile_allow(allow_partial))
+            return cut, tail.encode()
+
+        with mmap(file.fileno(), 0, access=ACCESS_READ) as data:
+            length = size - 4 + complete_utf8_length(data[-4:]) if size >= 4 else complete_utf8_length(data[:])
+            state = scan_mapped(data, length)
+            cut, tail = cut_scanned(MappedText(data, length), state, compile_allow(allow_partial))  # type: ignore  # duck-typed as a str
+
+    return cut, tail.encode()
+
+
+def repair_file(path: StrPath, allow_partial: Union[Allow, int] = ALL, output: Optional[StrPath] = None) -> Tuple[int, bytes]:
+    """
+    complete a (truncated) JSON file in place, or write the completed JSON to `output`
+
+    The file is truncated before its partial end and the completion is appended. With `output`, the kept part is copied block by block.
+    """
+
+    cut, tail = fix_file(path, allow_partial)
+
+    if output is None:
+        with open(path, "r+b") as file:
+            file.truncate(cut)
+            file.seek(cut)
+            file.write(tail)
+
+    else:
+        with open(path, "rb") as source, open(output, "wb") as target:
+            remaining = cut
+            while remaining:
+                block = source.read(min(BLOCK_SIZE, remaining))
+                target.write(block)
+                remaining -= len(block)
+            target.write(tail)
+
+    return cut, tail
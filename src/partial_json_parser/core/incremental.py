@@ -0,0 +1,316 @@
+from array import array
+from codecs import getincrementaldecoder
+from json import JSONDecoder, loads
+from re import compile
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .api import JSON
+from .checkpoint import dump_checkpoint, load_checkpoint
+from .myelin import ScanState, cut_scanned, fix_scanned, join_closing_tokens
+from .numeric import (
+    compact,
+    decode_numbers,
+    extend,
+    join_members,
+    load_numpy,
+    to_numbers,
+)
+from .options import *
+from .utf8 import BytesLike
+
+whitespace = compile(r"[ \t\n\r]*")
+raw_decode = JSONDecoder().raw_decode
+
+
+def skip_whitespace(json_string: str, index: int) -> int:
+    return whitespace.match(json_string, index).end()  # type: ignore  # always matches
+
+
+MISSING = object()  # the previous value of a key which was not in an object
+
+
+class Frame:
+    """
+    An open container, whose decoded members followed by a comma will never change
+
+    Its `items` hold these finished members, followed by the members of the last result after them, which are removed before it
+    advances. So the container returned by `IncrementalParser.parse_json` is updated in place by the next calls instead of being rebuilt.
+    """
+
+    __slots__ = ("start", "cursor", "items", "mixed", "trailing")
+
+    def __init__(self, start: int, char: str):
+        self.start = start
+        self.cursor = start + 1
+        self.mixed = False  # whether the members are known not to be all numbers, see `advance`
+        self.items: Union[List[JSON], Dict[str, JSON], array] = [] if char == "[" else {}
+        self.trailing: list = []  # the members after the finished ones, or for an object their keys along with their previous values
+
+    def advance(self, json_string: str, limit: int, numeric_arrays=False, numpy=None):
+        """
+        decode the finished members before `limit`
+
+        Only the members before the last comma may be finished, so nothing after it is decoded, and no decoding fails on the whole string.
+        With `numeric_arrays`, the members of an array holding only numbers so far are decoded at once and appended to an `array`.
+        """
+
+        self.settle()
+
+        separator = json_string.rfind(",", self.cursor, limit)
+        if separator == -1:  # no member is finished
+            return
+
+        if numeric_arrays and not self.mixed and not isinstance(self.items, dict):
+            numbers = decode_numbers(json_string[self.cursor : separator])
+            if numbers is not None:
+                self.items = extend(self.items, numbers)
+                self.cursor = separator + 1
+                return
+
+            self.demote()
+
+        items = self.items
+        offset = self.cursor
+        text = json_string[offset : separator + 1]
+        limit = len(text)
+        cursor = 0
+
+        try:
+            while True:
+                i = skip_whitespace(text, cursor)
+                if i >= limit:
+                    break
+
+                if isinstance(items, dict):
+                    if text[i] != '"':
+                        break
+                    key, i = raw_decode(text, i)
+                    i = skip_whitespace(text, i)
+                    if i >= limit or text[i] != ":":
+                        break
+                    i = skip_whitespace(text, i + 1)
+                    if i >= limit:
+                        break
+
+                value, end = raw_decode(text, i)
+
+                end = skip_whitespace(text, end)
+                if end >= limit or text[end] != ",":
+                    break
+
+                if numeric_arrays:
+                    value = compact(value, numpy)
+
+                if isinstance(items, dict):
+                    items[key] = value
+                else:
+                    assert isinstance(items, list)
+                    items.append(value)
+
+                cursor = end + 1
+
+        except ValueError:  # the member is not finished yet
+            pass
+
+        self.cursor = offset + cursor
+
+    def demote(self):
+        """decode the members one by one from now on, starting over so that the integers in a float array are decoded as integers again"""
+
+        if isinstance(self.items, array):
+            self.items = []
+            self.cursor = self.start + 1
+        self.mixed = True
+
+    def settle(self):
+        """remove the members of the last result after the finished ones"""
+
+        items, trailing = self.items, self.trailing
+        if not trailing:
+            return
+
+        if isinstance(items, dict):
+            for key, previous in reversed(trailing):
+                if previous is MISSING:
+                    del items[key]
+                else:
+                    items[key] = previous
+        else:
+            del items[len(items) - len(trailing) :]
+
+        self.trailing = []
+
+    def attach(self, members: Union[List[JSON], Dict[str, JSON]], numeric_arrays=False, numpy=None) -> Any:
+        """put the decoded `members` after the finished ones, and get the container"""
+
+        items = self.items
+
+        if isinstance(items, dict):
+            assert isinstance(members, dict)
+            for key, value in (compact(members, numpy) if numeric_arrays else members).items():
+                self.trailing.append((key, items.get(key, MISSING)))
+                items[key] = value
+            return items
+
+        assert isinstance(members, list)
+
+        if numeric_arrays:
+            if isinstance(items, array) and numpy is None:
+                numbers = to_numbers(members) if members else items[:0]
+                if numbers is not None and numbers.typecode == items.typecode:
+                    items.extend(numbers)
+                    self.trailing = members
+                    return items
+            if isinstance(items, array) or not items:
+                return join_members(items, members, numpy)  # a new array, as NumPy arrays cannot grow and the type code may change
+            members = [compact(member, numpy) for member in members]
+
+        items.extend(members)
+        self.trailing = members
+        return items
+
+
+class IncrementalParser:
+    """Keep the scan state of a growing buffer, so that feeding a chunk only scans the chunk itself"""
+
+    def __init__(self, allow_partial: Union[Allow, int] = ALL, numeric_arrays: Optional[str] = None):
+        self.allow = compile_allow(allow_partial)
+        self.buffer = ""
+        self.state = ScanState()
+        self.frames: Dict[int, Frame] = {}
+        self.decoder = getincrementaldecoder("utf-8")()
+        self.numeric_arrays = numeric_arrays is not None  # whether to decode homogeneous numeric arrays compactly, see `compact_arrays`
+        self.numpy = load_numpy(numeric_arrays) if numeric_arrays is not None else None
+
+    @classmethod
+    def resume(
+        cls, buffer: Union[str, BytesLike], checkpoint: bytes, allow_partial: Union[Allow, int] = ALL, numeric_arrays: Optional[str] = None
+    ) -> "IncrementalParser":
+        """
+        continue parsing `buffer` from a `checkpoint` of a parser which had received a prefix of it, like on another worker
+
+        Only the part of `buffer` after the checkpoint is scanned. `InvalidCheckpoint` is raised if the checkpoint does not match it.
+        """
+
+        parser = cls(allow_partial, numeric_arrays)
+        if not isinstance(buffer, str):
+            buffer = parser.decoder.decode(buffer)
+
+        parser.state = load_checkpoint(checkpoint, buffer)
+        parser.buffer = buffer
+        parser.state.scan(buffer)
+        return parser
+
+    def checkpoint(self) -> bytes:
+        """a compact versioned snapshot of the scan state, from which `IncrementalParser.resume` continues with the same buffer"""
+
+        return dump_checkpoint(self.state, self.buffer)
+
+    def append(self, chunk: Union[str, BytesLike]):
+        """
+        append `chunk` to the buffer and scan it, without completing the buffer
+
+        UTF-8 encoded chunks are decoded incrementally, so a multi-byte character may be split between chunks.
+        """
+
+        if not isinstance(chunk, str):
+            chunk = self.decoder.decode(chunk)
+
+        buffer = self.buffer
+        self.buffer = ""  # so that the concatenation below may happen in place
+        buffer += chunk
+        self.buffer = buffer
+        self.state.scan(buffer)
+
+    def feed(self, chunk: Union[str, BytesLike]):
+        """append `chunk` to the buffer and get the completed JSON string, the same as `ensure_json(buffer)`"""
+
+        self.append(chunk)
+        return self.ensure_json()
+
+    def fix(self):
+        """get the original slice and the trailing suffix separately, the same as `fix_fast(buffer)`"""
+
+        return fix_scanned(self.buffer, self.state, self.allow)
+
+    def ensure_json(self):
+        head, tail = self.fix()
+        return head + tail
+
+    def parse_json(self, parser: Optional[Callable[[str], JSON]] = None) -> JSON:
+        """
+        the same as `parse_json(buffer)`, but the finished members of open containers are decoded only once
+
+        Note that these finished values are shared among the results of successive calls, and that the containers which are still open
+        are updated in place by the next calls rather than rebuilt, so copy a result (with `copy.deepcopy`) to keep it as it is.
+        """
+
+        if parser is not None:
+            return parser(self.ensure_json())
+
+        cut, tail = cut_scanned(self.buffer, self.state, self.allow)  # without copying the head
+
+        stack = self.state.stack
+        depth = 0
+        while depth < len(stack) and stack[depth][0] < cut:
+            depth += 1
+
+        if depth and tail.endswith(join_closing_tokens(stack[:depth])):
+            try:
+                return self._materialize(stack[:depth], cut, tail[: len(tail) - depth])
+            except (ValueError, IndexError):
+                pass
+
+        value = loads(self.buffer[:cut] + tail)
+        return compact(value, self.numpy) if self.numeric_arrays else value
+
+    def _materialize(self, opened: List[Tuple[int, str]], cut: int, completion: str) -> JSON:
+        json_string = self.buffer
+        numeric_arrays, numpy = self.numeric_arrays, self.numpy
+        frames = {}
+
+        for index in reversed(range(len(opened))):
+            start, char = opened[index]
+            frame = frames[start] = self.frames.get(start) or Frame(start, char)
+
+            if index == len(opened) - 1:  # the innermost container, whose last member may be partial
+                limit = cut
+                if self.state.in_string and self.state.last_string_start > frame.cursor:  # no member after an open string is finished
+                    limit = min(limit, self.state.last_string_start)
+                frame.advance(json_string, limit, numeric_arrays, numpy)
+
+                if frame.cursor > cut:  # truncated before the last comma
+                    if json_string[cut : frame.cursor].strip() != ",":
+                        raise ValueError
+                    rest = completion
+                else:
+                    rest = json_string[frame.cursor : cut] + completion
+
+                value = frame.attach(loads(char + rest + ("}" if char == "{" else "]")), numeric_arrays, numpy)
+
+            else:  # the last member is the next open container
+                limit = opened[index + 1][0]
+                if numeric_arrays and not frame.mixed and char == "[":
+                    frame.demote()
+                frame.advance(json_string, limit, numeric_arrays, numpy)
+
+                i = skip_whitespace(json_string, frame.cursor)
+
+                if isinstance(frame.items, dict):
+                    if json_string[i] != '"':
+                        raise ValueError
+                    key, i = raw_decode(json_string, i)
+                    i = skip_whitespace(json_string, i)
+                    if json_string[i] != ":":
+                        raise ValueError
+                    i = skip_whitespace(json_string, i + 1)
+                    if i != limit:
+                        raise ValueError
+                    value = frame.attach({key: value})
+                else:
+                    if i != limit:
+                        raise ValueError
+                    value = frame.attach([value])
+
+        self.frames = frames
+        return value
@@ -0,0 +1,84 @@
+from collections import Counter
+from time import perf_counter
+
+from . import complete, myelin
+from .myelin import ScanState, cut_scanned
+from .options import *
+
+
+class Stats:
+    """
+    Counters and timings of `fix_fast`, collected while instrumentation is enabled
+
+    - `branches` counts which branch of the resolution phase completed each input
+    - `slow_calls` and `slow_chars` count the fallbacks to the slow engine and the characters they received
+    - `scan_seconds` and `resolve_seconds` split the time of `fix_fast` in its two phases, and `slow_seconds` is the part of the latter spent in the slow engine
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.branches: "Counter[str]" = Counter()
+        self.slow_calls = 0
+        self.slow_chars = 0
+        self.scan_seconds = 0.0
+        self.resolve_seconds = 0.0
+        self.slow_seconds = 0.0
+
+    def record(self, branch: str):
+        self.branches[branch] += 1
+
+    def cut_fast(self, json_string: str, allow: Profile):
+        self.calls += 1
+
+        start = perf_counter()
+        if myelin.prefix_cache is None:
+            state = ScanState()
+            state.scan(json_string)
+        else:
+            state = myelin.prefix_cache.scan(json_string)
+        scanned = perf_counter()
+        self.scan_seconds += scanned - start
+
+        try:
+            return cut_scanned(json_string, state, allow)
+        finally:
+            self.resolve_seconds += perf_counter() - scanned
+
+    def slow_cut(self, json_string: str, index: int, allow: Profile, is_top_level=False, closer=None):
+        self.slow_calls += 1
+        self.slow_chars += len(json_string) - index
+
+        start = perf_counter()
+        try:
+            return complete._cut(json_string, index, allow, is_top_level, closer)
+        finally:
+            self.slow_seconds += perf_counter() - start
+
+    def snapshot(self):
+        """a snapshot of the counters"""
+
+        return {
+            "calls": self.calls,
+            "branches": dict(self.branches),
+            "slow_calls": self.slow_calls,
+            "slow_chars": self.slow_chars,
+            "scan_seconds": self.scan_seconds,
+            "resolve_seconds": self.resolve_seconds,
+            "slow_seconds": self.slow_seconds,
+        }
+
+
+def enable_instrumentation():
+    """make `fix_fast` count its branches and fallbacks and time its phases, at a small cost per call"""
+
+    myelin.stats = stats = Stats()
+    myelin._cut = stats.slow_cut
+    return stats
+
+
+def disable_instrumentation():
+    myelin.stats = None
+    myelin._cut = complete._cut
@@ -0,0 +1,188 @@
+from codecs import getincrementaldecoder
+from re import compile
+from typing import Callable, Optional, Union
+
+from .api import JSON
+from .exceptions import PartialJSON
+from .incremental import IncrementalParser
+from .options import *
+from .split import BracketTracker, match_atom
+from .utf8 import BytesLike
+
+search_candidate = compile(r"```|[\[{]").search
+match_fence_line = compile(r"```[ \t]*([^\s`]*)[^\n]*\n").match  # an opening fence and its info string
+match_first_char = compile(r"\s*(\S?)").match
+
+value_starts = {"{": '"}', "[": '[]{}"-0123456789tfn'}  # what may follow an opening bracket which starts a JSON value
+literals = ("true", "false", "null")
+
+
+class JSONLocator:
+    """
+    Locate a JSON payload in text which is received chunk by chunk, like the answer of a language model, and parse it incrementally
+
+    The payload is the content of the first fenced code block tagged as JSON (or not tagged at all), or else the first bracket which
+    looks like the start of a JSON value. Other code blocks are skipped. The text before the payload is searched only once and then
+    dropped, and the payload is fed to an `IncrementalParser` up to where its brackets are closed, so that the text after it is ignored.
+    """
+
+    def __init__(self, allow_partial: Union[Allow, int] = ALL):
+        self.parser = IncrementalParser(allow_partial)  # of the payload
+        self.prose = ""  # the text which has not been searched yet
+        self.received = 0  # how long the text is in total
+        self.skipping = False  # whether `prose` starts inside a code block which is not JSON
+        self.fenced = False  # whether the payload is (or will be) inside a fenced code block
+        self.start: Optional[int] = None  # where the payload starts in the text, once found
+        self.end: Optional[int] = None  # where the payload ends in the text, once complete
+        self.tracker = BracketTracker()  # of the payload, from `tracked`
+        self.tracked = 0  # where the tracking resumes in the payload
+        self.decoder = getincrementaldecoder("utf-8")()
+
+    @property
+    def payload(self) -> str:
+        """the payload received so far, which is empty until it is found"""
+
+        return self.parser.buffer
+
+    def feed(self, chunk: Union[str, BytesLike]) -> bool:
+        """
+        consume `chunk` and get whether the payload is complete
+
+        UTF-8 encoded chunks are decoded incrementally, and the offsets `start` and `end` count decoded characters.
+        """
+
+        if not isinstance(chunk, str):
+            chunk = self.decoder.decode(chunk)
+
+        offset = self.received
+        self.received += len(chunk)
+
+        if self.end is not None:
+            return True
+
+        if self.start is None:
+            prose = self.prose
+            self.prose = ""  # so that the concatenation below may happen in place
+            prose += chunk
+            start = self.search(prose)
+            if start is None:
+                return False
+
+            self.start = offset + len(chunk) - len(prose) + start  # everything before `prose` has been dropped
+            chunk = prose[start:]
+
+        return self.track(chunk)
+
+    def search(self, prose: str) -> Optional[int]:
+        """search `prose` for the start of the payload, keeping what may be part of a candidate in `self.prose`"""
+
+        cursor = 0
+
+        while True:
+            if self.skipping:
+                closing = prose.find("```", cursor)
+                if closing == -1:
+                    cursor = max(cursor, len(prose) - 2)  # the closing fence may be cut
+                    break
+                self.skipping = False
+                cursor = closing + 3
+
+            if self.fenced:  # the payload is the first non-blank character
+                first = match_first_char(prose, cursor)
+                assert first is not None  # always matches, maybe an empty string
+                if not first.group(1):
+                    cursor = first.end()
+                    break
+                if first.group(1) != "`":
+                    return first.start(1)
+                self.fenced = False  # an empty code block
+                cursor = first.end() + 2
+
+            match = search_candidate(prose, cursor)
+            if match is None:
+                cursor = max(cursor, len(prose) - 2)  # the start of a fence may be cut
+                break
+
+            if match.group() == "```":
+                fence = match_fence_line(prose, match.start())
+                if fence is None:  # the line is not finished yet
+                    cursor = match.start()
+                    break
+                tag = fence.group(1).lower()
+                if tag.startswith("json") or not tag:
+                    self.fenced = True
+                else:
+                    self.skipping = True
+                cursor = fence.end()
+                continue
+
+            follower = match_first_char(prose, match.end())
+            assert follower is not None  # always matches, maybe an empty string
+            if not follower.group(1):  # nothing follows yet
+                cursor = match.start()
+                break
+            if follower.group(1) in value_starts[match.group()]:
+                if follower.group(1) not in "tfn":
+                    return match.start()
+                word = prose[follower.start(1) : follower.start(1) + 5]
+                if word.startswith(literals):  # unlike "[the one below]"
+                    return match.start()
+                if follower.start(1) + len(word) == len(prose) and any(literal.startswith(word) for literal in literals):  # cut
+                    cursor = match.start()
+                    break
+            cursor = match.end()
+
+        self.prose = prose[cursor:]
+        return None
+
+    def track(self, chunk: str) -> bool:
+        """feed the payload in `chunk` to the parser and get whether it is complete"""
+
+        parser = self.parser
+        resumed = self.tracked
+        window = parser.buffer[resumed:] + chunk  # the tracking only resumes from near the end of the payload
+
+        if (parser.buffer or chunk)[:1] in '[{"':
+            self.tracker.scanned = 0
+            end = self.tracker.find_end(window)
+        else:  # a top-level atom, which ends at the first character which cannot be part of it
+            match = match_atom(window)
+            end = match.end() if match is not None and match.end() < len(window) else None
+
+        if end is None:
+            parser.append(chunk)
+            self.tracked = resumed + (self.tracker.scanned if self.tracker.scanned != -1 else 0)
+            return False
+
+        parser.append(chunk[: resumed + end - len(parser.buffer)])
+        assert self.start is not None
+        self.end = self.start + len(parser.buffer)
+        return True
+
+    @property
+    def found(self):
+        return self.start is not None
+
+    @property
+    def complete(self):
+        return self.end is not None
+
+    def fix(self):
+        """the same as `fix_fast(payload)`, see `IncrementalParser.fix`"""
+
+        if self.start is None:
+            raise PartialJSON("no JSON payload has been found")
+
+        return self.parser.fix()
+
+    def ensure_json(self):
+        head, tail = self.fix()
+        return head + tail
+
+    def parse_json(self, parser: Optional[Callable[[str], JSON]] = None) -> JSON:
+        """the same as `parse_json(payload)`, see `IncrementalParser.parse_json`"""
+
+        if self.start is None:
+            raise PartialJSON("no JSON payload has been found")
+
+        return self.parser.parse_json(parser)
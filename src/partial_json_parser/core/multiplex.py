@@ -0,0 +1,187 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+from .api import JSON
+from .exceptions import MalformedJSON, PartialJSON
+from .incremental import IncrementalParser
+from .options import *
+from .utf8 import BytesLike
+
+
+class Stream:
+    """The parser of a stream, when it was last fed, and how many of its characters are counted as buffered"""
+
+    __slots__ = ("parser", "updated", "size", "lock")
+
+    def __init__(self, allow: Profile, now: float):
+        self.parser = IncrementalParser(allow)
+        self.updated = now
+        self.size = 0
+        self.lock = Lock()  # held while the parser is fed or parsed, so that other streams are not blocked meanwhile
+
+
+class StreamMultiplexer:
+    """
+    Route the chunks of many interleaved streams, like the arguments of parallel tool calls, to a parser per stream id
+
+    The streams are kept in the order they were last fed, so that feeding a chunk, evicting the idle streams and enforcing the memory
+    limit take constant time (amortized) whatever the number of streams. Only the streams fed since the last `flush` are parsed by it.
+    All the methods may be called from several threads, and a stream being parsed only blocks the chunks of that stream.
+    """
+
+    def __init__(
+        self,
+        allow_partial: Union[Allow, int] = ALL,
+        max_chars: Optional[int] = None,
+        max_idle: Optional[float] = None,
+        on_evict: Optional[Callable[[Hashable, str], None]] = None,
+    ):
+        self.allow = compile_allow(allow_partial)
+        self.max_chars = max_chars  # how many characters may be buffered across all the streams
+        self.max_idle = max_idle  # how many seconds a stream may go without a chunk
+        self.on_evict = on_evict  # called with the id of every evicted stream and why, "idle", "memory" or "malformed"
+        self.streams: "OrderedDict[Hashable, Stream]" = OrderedDict()  # the least recently fed first
+        self.dirty: Dict[Hashable, None] = {}  # the streams fed since the last flush, as an ordered set
+        self.buffered = 0  # how many characters are buffered across all the streams
+        self.lock = Lock()
+
+    def __len__(self):
+        return len(self.streams)
+
+    def __contains__(self, stream_id: Hashable):
+        return stream_id in self.streams
+
+    def feed(self, stream_id: Hashable, chunk: Union[str, BytesLike]):
+        """
+        append `chunk` to the stream `stream_id`, which is opened if it is not open yet
+
+        `MalformedJSON` is raised if the chunk makes the stream malformed, and the stream is discarded.
+        Note that feeding an evicted stream again opens a new one, so `on_evict` is the place to cancel its producer.
+        """
+
+        with self.lock:
+            now = monotonic()
+
+            stream = self.streams.get(stream_id)
+            if stream is None:
+                stream = self.streams[stream_id] = Stream(self.allow, now)
+            else:
+                stream.updated = now
+                self.streams.move_to_end(stream_id)
+
+        try:
+            with stream.lock:
+                stream.parser.append(chunk)
+                size = len(stream.parser.buffer)
+        except (AssertionError, IndexError) as err:
+            with self.lock:
+                if self.streams.get(stream_id) is stream:
+                    self._remove(stream_id)
+            raise MalformedJSON(*err.args) from err
+
+        with self.lock:
+            if self.streams.get(stream_id) is stream:  # unless it has been closed or evicted meanwhile
+                self.buffered += size - stream.size
+                stream.size = size
+                self.dirty[stream_id] = None
+
+            evicted = self._evict(now)
+
+        self._notify(evicted)
+
+    def flush(self, parser: Optional[Callable[[str], JSON]] = None) -> Dict[Hashable, JSON]:
+        """
+        get the current values of the streams fed since the last flush, in the order they were first fed since then
+
+        The streams which cannot be parsed yet, as they are not allowed to be partial, stay pending. Malformed streams are evicted.
+        The streams are parsed outside of the lock, so that the other streams can be fed meanwhile.
+        """
+
+        values: Dict[Hashable, JSON] = {}
+        pending: List[Tuple[Hashable, Stream]] = []
+        malformed: List[Tuple[Hashable, Stream]] = []
+
+        with self.lock:
+            dirty = [(stream_id, self.streams[stream_id]) for stream_id in self.dirty]
+            self.dirty = {}
+
+        for stream_id, stream in dirty:
+            with stream.lock:
+                try:
+                    values[stream_id] = stream.parser.parse_json(parser)
+                except PartialJSON:
+                    pending.append((stream_id, stream))
+                except (ValueError, AssertionError, IndexError):  # like in `feed`, the engines assert on malformed input
+                    malformed.append((stream_id, stream))
+
+        with self.lock:
+            for stream_id, stream in pending:
+                if self.streams.get(stream_id) is stream:
+                    self.dirty[stream_id] = None
+
+            evicted: List[Tuple[Hashable, str]] = []
+            for stream_id, stream in malformed:
+                if self.streams.get(stream_id) is stream:
+                    self._remove(stream_id)
+                    evicted.append((stream_id, "malformed"))
+
+            evicted += self._evict(monotonic())
+
+        self._notify(evicted)
+        return values
+
+    def close(self, stream_id: Hashable, parser: Optional[Callable[[str], JSON]] = None) -> JSON:
+        """
+        end the stream `stream_id` and get its final value, completed like `parse_json` does
+
+        `KeyError` is raised if the stream is not open, and the stream is closed even if its value cannot be parsed.
+        """
+
+        with self.lock:
+            stream = self._remove(stream_id)
+
+        with stream.lock:
+            return stream.parser.parse_json(parser)
+
+    def discard(self, stream_id: Hashable):
+        """drop the stream `stream_id` if it is open"""
+
+        with self.lock:
+            if stream_id in self.streams:
+                self._remove(stream_id)
+
+    def _remove(self, stream_id: Hashable) -> Stream:
+        stream = self.streams.pop(stream_id)
+        self.dirty.pop(stream_id, None)
+        self.buffered -= stream.size
+        return stream
+
+    def _evict(self, now: float):
+        """evict the idle streams, and then the least recently fed ones while the memory limit is exceeded"""
+
+        evicted: List[Tuple[Hashable, str]] = []
+        streams = self.streams
+
+        if self.max_idle is not None:
+            deadline = now - self.max_idle
+            while streams:
+                stream_id, stream = next(iter(streams.items()))
+                if stream.updated >= deadline:
+                    break
+                self._remove(stream_id)
+                evicted.append((stream_id, "idle"))
+
+        if self.max_chars is not None:
+            while self.buffered > self.max_chars and streams:
+                stream_id = next(iter(streams))
+                self._remove(stream_id)
+                evicted.append((stream_id, "memory"))
+
+        return evicted
+
+    def _notify(self, evicted: List[Tuple[Hashable, str]]):
+        if self.on_evict is not None:
+            for stream_id, reason in evicted:
+                self.on_evict(stream_id, reason)
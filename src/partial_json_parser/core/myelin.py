@@ -1,16 +1,31 @@
 """Myelin acts as the highway among neurons, epitomizing the leapfrog methodology within this algorithm."""
 
 from re import compile
-from typing import List, Tuple, Union
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union, overload
 
-from .complete import _fix
+from .complete import _cut, cut_open_str, is_escaped, skip_blank
 from .exceptions import PartialJSON
 from .options import *
+from .utf8 import BytesLike, fix_bytes
 
+if TYPE_CHECKING:
+    from .cache import PrefixCache
+    from .instrument import Stats
+
+# a whole string literal (escapes included) is a single token, so quotes never need to be checked for escaping
+# the captured group is the closing quote, which is empty if the string is not terminated yet
+tokenize = compile(r'"[^"\\]*(?:\\[\s\S][^"\\]*)*("?)|[\[\]{}]').finditer
+match_string_rest = compile(r'[^"\\]*(?:\\[\s\S][^"\\]*)*("?)').match
 finditer = compile(r'["\[\]{}]').finditer
 
 
+prefix_cache: Optional["PrefixCache"] = None  # see `enable_prefix_cache`
+stats: Optional["Stats"] = None  # see `enable_instrumentation`
+
+
 def scan(json_string: str):
+    """the structural tokens of `json_string` as a list of `(index, char)` pairs, which `ScanState.scan` consumes lazily instead"""
+
     return [(match.start(), match.group()) for match in finditer(json_string)]
 
 
@@ -18,49 +33,161 @@ def join_closing_tokens(stack: List[Tuple[int, str]]):
     return "".join("}" if char == "{" else "]" for _, char in reversed(stack))
 
 
-def fix_fast(json_string: str, allow_partial: Union[Allow, int] = ALL):
-    allow = Allow(allow_partial)
+class ScanState:
+    """The bracket stack and string boundaries of a scanned prefix, which can be resumed when more text is appended"""
+
+    __slots__ = ("stack", "in_string", "last_string_start", "last_string_end", "last_token", "first_token", "offset")
+
+    def __init__(self):
+        self.stack: List[Tuple[int, str]] = []
+        self.in_string = False
+        self.last_string_start = -1
+        self.last_string_end = -1
+        self.last_token: Tuple[int, str] = (-1, "")
+        self.first_token = ""
+        self.offset = 0
+
+    def copy(self):
+        state = ScanState()
+        state.stack = self.stack.copy()
+        state.in_string = self.in_string
+        state.last_string_start = self.last_string_start
+        state.last_string_end = self.last_string_end
+        state.last_token = self.last_token
+        state.first_token = self.first_token
+        state.offset = self.offset
+        return state
+
+    def scan(self, json_string: str):
+        """scan `json_string[self.offset:]`, given that `json_string[:self.offset]` has been scanned before"""
+
+        start, self.offset = self.offset, len(json_string)
 
-    def is_escaped(index: int):
-        text_before = json_string[:index]
-        count = index - len(text_before.rstrip("\\"))
-        return count % 2
+        if self.first_token == '"':  # top-level string, left to the slow engine
+            return
 
-    stack = []
-    in_string = False
-    last_string_start = -1
-    last_string_end = -1
+        stack = self.stack
+        in_string = self.in_string
+        last_string_start = self.last_string_start
+        last_string_end = self.last_string_end
 
-    tokens = scan(json_string)
+        i, char = self.last_token
 
-    if not tokens or tokens[0][1] == '"':
-        return _fix(json_string, allow, True)
+        try:
+            if in_string:  # resume inside the open string
+                match = match_string_rest(json_string, start)
+                assert match is not None  # always matches, maybe an empty string
+                if not match.group(1):
+                    self.offset = match.end()
+                    return
 
-    for i, char in tokens:
-        if char == '"':
-            if not in_string:
-                in_string = True
-                last_string_start = i
-            elif not is_escaped(i):
                 in_string = False
-                last_string_end = i
-
-        elif not in_string:
-            if char == "}":
-                _i, _char = stack.pop()
-                assert _char == "{", f"Expected '{{' at index {_i}, got '{_char}'"
-            elif char == "]":
-                _i, _char = stack.pop()
-                assert _char == "[", f"Expected '[' at index {_i}, got '{_char}'"
-            else:
-                stack.append((i, char))
+                i = last_string_end = match.end() - 1
+                start = match.end()
+
+            for match in tokenize(json_string, start):
+                i = match.start()
+                char = json_string[i]
+
+                if not self.first_token:
+                    self.first_token = char
+                    if char == '"':
+                        return
+
+                if char == '"':
+                    last_string_start = i
+                    if match.group(1):
+                        i = last_string_end = match.end() - 1
+                    else:  # only the last token can be an open string
+                        in_string = True
+                        self.offset = match.end()
+                elif char == "}":
+                    _i, _char = stack.pop()
+                    assert _char == "{", f"Expected '{{' at index {_i}, got '{_char}'"
+                elif char == "]":
+                    _i, _char = stack.pop()
+                    assert _char == "[", f"Expected '[' at index {_i}, got '{_char}'"
+                else:
+                    stack.append((i, char))
+
+        finally:
+            self.in_string = in_string
+            self.last_string_start = last_string_start
+            self.last_string_end = last_string_end
+            self.last_token = i, char
+
+
+@overload
+def fix_fast(json_string: str, allow_partial: Union[Allow, int] = ALL) -> Tuple[str, str]: ...
+@overload
+def fix_fast(json_string: BytesLike, allow_partial: Union[Allow, int] = ALL) -> Tuple[bytes, bytes]: ...
+
+
+def fix_fast(json_string: Union[str, BytesLike], allow_partial: Union[Allow, int] = ALL):
+    if not isinstance(json_string, str):
+        return fix_bytes(fix_fast, json_string, allow_partial)
+
+    cut, tail = cut_fast(json_string, compile_allow(allow_partial))
+    return json_string[:cut], tail
+
+
+def cut_fast(json_string: str, allow: Profile) -> Tuple[int, str]:
+    """where to cut `json_string` and what to append to it, which is what `fix_fast` returns without slicing the head"""
+
+    if stats is not None:
+        return stats.cut_fast(json_string, allow)
+
+    if prefix_cache is None:
+        state = ScanState()
+        state.scan(json_string)
+    else:
+        state = prefix_cache.scan(json_string)
+
+    return cut_scanned(json_string, state, allow)
+
+
+def fix_scanned(json_string: str, state: ScanState, allow: Profile):
+    """complete `json_string` from its scan state, which must cover the whole string"""
+
+    cut, tail = cut_scanned(json_string, state, allow)
+    return json_string[:cut], tail
+
+
+def cut_after_comma(json_string: str, last_comma: int, closer: str, allow: Profile):
+    """complete the members after the last comma of a collection closed by `closer`, and cut before the comma if none of them is left"""
+
+    end, tail = _cut(json_string, last_comma + 1, allow, closer=closer)
+    if end == last_comma + 1 and not tail[:-1].strip():
+        return last_comma, tail
+    return end, tail
+
+
+def cut_scanned(json_string: str, state: ScanState, allow: Profile) -> Tuple[int, str]:
+    """
+    where to cut `json_string` and what to append to it, from its scan state which must cover the whole string
+
+    The string is only searched within offset bounds, so no part of it is copied.
+    """
+
+    if state.first_token in ("", '"'):
+        if stats is not None:
+            stats.record("top-level atom")
+        return _cut(json_string, 0, allow, True)
+
+    stack = state.stack
+    in_string = state.in_string
+    last_string_start = state.last_string_start
+    last_string_end = state.last_string_end
+    i, char = state.last_token
 
     if not stack:
-        return json_string, ""
+        if stats is not None:
+            stats.record("complete")
+        return len(json_string), ""
 
     # check if the opening tokens are allowed
 
-    if (STR | COLLECTION) not in allow:
+    if not (allow.STR and allow.COLLECTION):
 
         def truncate_before_last_key_start(container_start: int, last_string_end: int, stack):
             last_key_start = last_string_end  # backtrace the last key's start and retry finding the last comma
@@ -68,20 +195,22 @@ def fix_fast(json_string: str, allow_partial: Union[Allow, int] = ALL):
                 last_key_start = json_string.rfind('"', container_start, last_key_start)
                 if last_key_start == -1:  # this is the only key
                     # { "key": "v
-                    return json_string[: container_start + 1], join_closing_tokens(stack)
-                if is_escaped(last_key_start):
+                    return container_start + 1, join_closing_tokens(stack)
+                if is_escaped(json_string, last_key_start):
                     last_key_start -= 1
                 else:
                     last_comma = json_string.rfind(",", container_start, last_key_start)
                     if last_comma == -1:
                         # { "key": "
-                        return json_string[: container_start + 1], join_closing_tokens(stack)
+                        return container_start + 1, join_closing_tokens(stack)
                     # # { ... "key": ... , "
-                    return json_string[:last_comma], join_closing_tokens(stack)
+                    return last_comma, join_closing_tokens(stack)
 
-    if COLLECTION not in allow:
+    if not allow.COLLECTION:
         for index, [_i, _char] in enumerate(stack):
-            if _char == "{" and OBJ not in allow or _char == "[" and ARR not in allow:
+            if not (allow.OBJ if _char == "{" else allow.ARR):
+                if stats is not None:
+                    stats.record("disallowed container")
                 if index == 0:
                     raise PartialJSON
 
@@ -99,7 +228,7 @@ def fix_fast(json_string: str, allow_partial: Union[Allow, int] = ALL):
                 if last_comma == -1:
                     if stack[index - 1][1] == "[":
                         # [ ... [
-                        return json_string[:_i], join_closing_tokens(stack[:index])
+                        return _i, join_closing_tokens(stack[:index])
 
                     # { "key": [ 1, 2, "v
                     # { "key": [ 1, 2, "value"
@@ -108,24 +237,26 @@ def fix_fast(json_string: str, allow_partial: Union[Allow, int] = ALL):
 
                     last_comma = json_string.rfind(",", stack[index - 1][0] + 1, last_string_start)
                     if last_comma == -1:
-                        return json_string[: stack[index - 1][0] + 1], join_closing_tokens(stack[:index])
-                    return json_string[:last_comma], join_closing_tokens(stack[:index])
+                        return stack[index - 1][0] + 1, join_closing_tokens(stack[:index])
+                    return last_comma, join_closing_tokens(stack[:index])
 
                 # { ..., "key": {
                 # ..., {
-                return json_string[:last_comma], join_closing_tokens(stack[:index])
+                return last_comma, join_closing_tokens(stack[:index])
 
-    if STR not in allow and in_string:  # truncate before the last key
+    if not allow.STR and in_string:  # truncate before the last key
+        if stats is not None:
+            stats.record("disallowed partial string")
         if stack[-1][0] > last_string_end and stack[-1][1] == "{":
             # { "k
-            return json_string[: stack[-1][0] + 1], join_closing_tokens(stack)
+            return stack[-1][0] + 1, join_closing_tokens(stack)
 
         last_comma = json_string.rfind(",", max(stack[-1][0], last_string_end) + 1, last_string_start)
         if last_comma != -1:
             # { "key": "v", "k
             # { "key": 123, "k
             # [ 1, 2, 3, "k
-            return json_string[:last_comma], join_closing_tokens(stack)
+            return last_comma, join_closing_tokens(stack)
 
         # { ... "key": "v
         return truncate_before_last_key_start(stack[-1][0], last_string_end, stack)
@@ -136,66 +267,78 @@ def fix_fast(json_string: str, allow_partial: Union[Allow, int] = ALL):
 
     if in_string:
         if stack[-1][1] == "[":  # [ ... "val
-            head, tail = _fix(json_string[last_string_start:], allow)  # fix the last string
-            return json_string[:last_string_start] + head, tail + join_closing_tokens(stack)
+            if stats is not None:
+                stats.record("partial string in array")
+            return cut_open_str(json_string, last_string_start), '"' + join_closing_tokens(stack)  # fix the last string
 
         assert stack[-1][1] == "{"  # { ... "val
 
         start = max(last_string_end, stack[-1][0])
+        last_comma = json_string.rfind(",", start + 1, last_string_start)
 
-        if "," in json_string[start + 1 : last_string_start]:
+        if last_comma != -1:
             # { ... "k": "v", "key
             # { ... "k": 123, "key
-            last_comma = json_string.rindex(",", start, last_string_start)
-            head, tail = _fix(stack[-1][1] + json_string[last_comma + 1 :], allow)
-            return json_string[:last_comma] + head[1:], tail + join_closing_tokens(stack[:-1])
+            if stats is not None:
+                stats.record("partial key after comma")
+            cut, tail = cut_after_comma(json_string, last_comma, "}", allow)
+            return cut, tail + join_closing_tokens(stack[:-1])
 
-        if ":" in json_string[start + 1 : last_string_start]:
+        if json_string.find(":", start + 1, last_string_start) != -1:
             # { ... ": "val
-            head, tail = _fix(json_string[last_string_start:], allow)  # fix the last string (same as array)
-            return json_string[:last_string_start] + head, tail + join_closing_tokens(stack)
+            if stats is not None:
+                stats.record("partial string value")
+            return cut_open_str(json_string, last_string_start), '"' + join_closing_tokens(stack)  # fix the last string (same as array)
 
         # {"key
-        return json_string[:last_string_start], join_closing_tokens(stack)
+        if stats is not None:
+            stats.record("partial first key")
+        return last_string_start, join_closing_tokens(stack)
 
     last_comma = json_string.rfind(",", max(last_string_end, i) + 1)
 
     if last_comma != -1:
         i, char = stack[-1]
 
-        if not json_string[last_comma + 1 :].strip():  # comma at the end
+        if stats is not None:
+            stats.record("element after comma")
+        if skip_blank(json_string, last_comma + 1) == len(json_string):  # comma at the end
             # { ... "key": "value",
-            return json_string[:last_comma], join_closing_tokens(stack)
+            return last_comma, join_closing_tokens(stack)
 
         assert char == "[", json_string  # array with many non-string literals
 
         # [ ..., 1, 2, 3, 4
 
-        head, tail = _fix(char + json_string[last_comma + 1 :], allow)
-        if not head[1:] + tail[:-1].strip():  # empty, so trim the last comma
-            return json_string[:last_comma] + head[1:], tail + join_closing_tokens(stack[:-1])
-        return json_string[: last_comma + 1] + head[1:], tail + join_closing_tokens(stack[:-1])
+        cut, tail = cut_after_comma(json_string, last_comma, "]", allow)
+        return cut, tail + join_closing_tokens(stack[:-1])
 
     # can't find comma after the last string and after the last container token
 
     if char in "]}":
         # ... [ ... ]
         # ... { ... }
-        assert not json_string[i + 1 :].strip()
-        return json_string, join_closing_tokens(stack)
+        if stats is not None:
+            stats.record("closed container")
+        assert skip_blank(json_string, i + 1) == len(json_string)
+        return len(json_string), join_closing_tokens(stack)
 
     if char in "[{":
         # ... [ ...
         # ... { ...
-        head, tail = _fix(json_string[i:], allow)
-        return json_string[:i] + head, tail + join_closing_tokens(stack[:-1])
+        if stats is not None:
+            stats.record("open container")
+        cut, tail = _cut(json_string, i, allow)
+        return cut, tail + join_closing_tokens(stack[:-1])
 
     assert char == '"'
 
     i, char = stack[-1]
 
     if char == "[":  # [ ... "val"
-        return json_string, join_closing_tokens(stack)
+        if stats is not None:
+            stats.record("string in array")
+        return len(json_string), join_closing_tokens(stack)
 
     assert char == "{"
     last_colon = json_string.rfind(":", last_string_end)
@@ -204,23 +347,27 @@ def fix_fast(json_string: str, allow_partial: Union[Allow, int] = ALL):
     if last_comma == -1:  # only 1 key
         # ... { "key"
         # ... { "key": "value"
-        head, tail = _fix(json_string[i:], allow)
-        return json_string[:i] + head, tail + join_closing_tokens(stack[:-1])
+        if stats is not None:
+            stats.record("first member")
+        cut, tail = _cut(json_string, i, allow)
+        return cut, tail + join_closing_tokens(stack[:-1])
 
     if last_colon == -1:
+        if stats is not None:
+            stats.record("string after comma")
         if json_string.rfind(":", max(i, last_comma) + 1, last_string_start) != -1:
             # { ... , "key": "value"
-            return json_string, join_closing_tokens(stack)
+            return len(json_string), join_closing_tokens(stack)
 
         # { ... , "key"
-        head, tail = _fix("{" + json_string[last_comma + 1 :], allow)
-        if not head[1:] + tail[:-1].strip():
-            return json_string[:last_comma] + head[1:], tail + join_closing_tokens(stack[:-1])
-        return json_string[: last_comma + 1] + head[1:], tail + join_closing_tokens(stack)
+        cut, tail = cut_after_comma(json_string, last_comma, "}", allow)
+        if cut == last_comma:
+            return cut, tail + join_closing_tokens(stack[:-1])
+        return cut, tail + join_closing_tokens(stack)
 
+    if stats is not None:
+        stats.record("key and colon after comma")
     assert last_colon > last_comma  # { ... , "key":
 
-    head, tail = _fix("{" + json_string[last_comma + 1 :], allow)
-    if not head[1:] + tail[:-1].strip():
-        return json_string[:last_comma] + head[1:], tail + join_closing_tokens(stack[:-1])
-    return json_string[: last_comma + 1] + head[1:], tail + join_closing_tokens(stack[:-1])
+    cut, tail = cut_after_comma(json_string, last_comma, "}", allow)
+    return cut, tail + join_closing_tokens(stack[:-1])
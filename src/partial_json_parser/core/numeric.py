@@ -0,0 +1,153 @@
+from array import array
+from re import compile
+from typing import Any, Iterable, List, Optional, Union
+
+from .api import JSON
+
+NUMBER = r"(?:-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|NaN|-?Infinity)"
+
+fullmatch_numbers = compile(rf"[ \t\n\r]*{NUMBER}[ \t\n\r]*(?:,[ \t\n\r]*{NUMBER}[ \t\n\r]*)*").fullmatch
+search_float = compile(r"[.eEIN]").search  # a fraction, an exponent, NaN or Infinity
+search_long_digits = compile(r"\d{19}").search  # which may be an integer out of the 64-bit range
+
+MODES = ("array", "numpy", "auto")
+
+
+def load_numpy(mode: str):
+    """get the module to export the numeric arrays with in `mode`, which is NumPy or None for the `array` module"""
+
+    if mode not in MODES:
+        raise ValueError(f"numeric_arrays must be one of {', '.join(map(repr, MODES))}, got {mode!r}")
+
+    if mode == "array":
+        return None
+
+    try:
+        import numpy  # type: ignore
+    except ImportError:
+        if mode == "auto":
+            return None
+        raise
+
+    return numpy
+
+
+def fits_int64(integers: Iterable[int]):
+    try:
+        array("q", integers)
+    except OverflowError:  # kept as Python integers, which are exact
+        return False
+    return True
+
+
+def decode_numbers(text: str) -> Optional[array]:
+    """
+    decode comma-separated JSON numbers at once, as integers if none of them has a fraction or an exponent, or get None if it is something else
+
+    Like in `to_numbers`, the numbers are not decoded if an integer is out of the 64-bit range, so that the array is demoted to a list.
+    """
+
+    if fullmatch_numbers(text) is None:
+        return None
+
+    parts = text.split(",")
+
+    if search_float(text) is None:
+        try:
+            return array("q", map(int, parts))
+        except OverflowError:
+            return None
+
+    if search_long_digits(text) is not None and not fits_int64(int(part) for part in parts if search_float(part) is None):
+        return None
+
+    return array("d", map(float, parts))
+
+
+def to_numbers(values: List[Any]) -> Optional[array]:
+    """the decoded values as an array if they are all numbers (but not booleans) and their integers fit in 64 bits, or None"""
+
+    types = set(map(type, values))
+
+    if types == {int}:
+        try:
+            return array("q", values)
+        except OverflowError:
+            return None
+
+    if types and types <= {int, float}:
+        if int in types and not fits_int64(value for value in values if type(value) is int):
+            return None
+        return array("d", values)
+
+    return None
+
+
+def concat(items: Union[array, List], numbers: array) -> array:
+    """a new array of `items` (an array or an empty list) followed by `numbers`, promoted to floats if either holds floats"""
+
+    if not isinstance(items, array):
+        return array(numbers.typecode, numbers)
+    if items.typecode == numbers.typecode:
+        return items + numbers
+    return array("d", items) + array("d", numbers)
+
+
+def extend(items: Union[array, List], numbers: array) -> array:
+    """append `numbers` to `items` (an array or an empty list) in place when possible, and get the result"""
+
+    if not isinstance(items, array):
+        return numbers
+    if items.typecode == numbers.typecode:
+        items.extend(numbers)
+        return items
+    if items.typecode == "q":
+        items = array("d", items)
+    items.extend(array("d", numbers))
+    return items
+
+
+def join_members(items: Union[array, List], members: List[Any], numpy=None) -> Any:
+    """the members of an open array, which are the finished `items` (an array or a list) followed by the other decoded `members`"""
+
+    if isinstance(items, array) or not items:
+        numbers = to_numbers(members) if members else array(items.typecode) if isinstance(items, array) else None
+        if numbers is not None:
+            return export(concat(items, numbers), numpy)
+
+    return list(items) + [compact(member, numpy) for member in members]
+
+
+def export(numbers: array, numpy=None) -> Any:
+    """the array as returned to the caller, which must not be mutated afterwards as NumPy shares its memory"""
+
+    return numbers if numpy is None else numpy.frombuffer(numbers, numbers.typecode)
+
+
+def compact(value: Any, numpy=None) -> Any:
+    """replace the non-empty lists of numbers in a decoded value, nested or not, by arrays of 64-bit integers or floats"""
+
+    if isinstance(value, list):
+        numbers = to_numbers(value)
+        if numbers is not None:
+            return export(numbers, numpy)
+        for index, item in enumerate(value):
+            if isinstance(item, (list, dict)):
+                value[index] = compact(item, numpy)
+
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if isinstance(item, (list, dict)):
+                value[key] = compact(item, numpy)
+
+    return value
+
+
+def compact_arrays(value: JSON, numeric_arrays="array") -> Any:
+    """
+    replace the homogeneous numeric arrays of a decoded value by `array('q')` or `array('d')`, or by NumPy arrays
+
+    `numeric_arrays` is "array", "numpy" or "auto", which uses NumPy if it is installed.
+    """
+
+    return compact(value, load_numpy(numeric_arrays))
@@ -1,4 +1,5 @@
 from enum import IntFlag, auto
+from typing import Dict, Union
 
 
 class Allow(IntFlag):
@@ -37,6 +38,51 @@ COLLECTION = Allow.COLLECTION
 ALL = Allow.ALL
 
 
+class Profile(int):
+    """
+    An `Allow` value compiled into a plain boolean attribute per flag name, which the engines test instead of `IntFlag` membership
+
+    Get them from `compile_allow`, which caches one per flag value. Being an `int`, a profile can be passed anywhere an `Allow` can.
+    """
+
+    def __init__(self, allow_partial: Union[Allow, int]):
+        allow = self.allow = Allow(allow_partial)
+
+        self.STR = STR in allow
+        self.NUM = NUM in allow
+        self.ARR = ARR in allow
+        self.OBJ = OBJ in allow
+        self.NULL = NULL in allow
+        self.BOOL = BOOL in allow
+        self.NAN = NAN in allow
+        self.INFINITY = INFINITY in allow
+        self._INFINITY = _INFINITY in allow
+        self.COLLECTION = COLLECTION in allow
+        self.ALL = ALL in allow
+
+    def __contains__(self, flag: Allow):
+        return flag in self.allow
+
+    def __repr__(self):
+        return f"Profile({self.allow!r})"
+
+
+profiles: Dict[int, Profile] = {}
+
+
+def compile_allow(allow_partial: Union[Allow, int]) -> Profile:
+    """get the profile of `allow_partial`, which is compiled on the first call for its value and reused after"""
+
+    if allow_partial.__class__ is Profile:
+        return allow_partial  # type: ignore
+
+    try:
+        return profiles[allow_partial]
+    except KeyError:
+        profile = profiles[allow_partial] = Profile(allow_partial)
+        return profile
+
+
 __all__ = [
     "Allow",
     "STR",
@@ -53,4 +99,6 @@ __all__ = [
     "ATOM",
     "COLLECTION",
     "ALL",
+    "Profile",
+    "compile_allow",
 ]
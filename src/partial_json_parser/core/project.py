@@ -0,0 +1,163 @@
+from re import compile
+from typing import Callable, Optional, Sequence, Union
+
+from .api import JSON, parse_json
+from .complete import _fix
+from .exceptions import PartialJSON
+from .incremental import raw_decode, skip_whitespace
+from .myelin import fix_fast, tokenize
+from .options import *
+from .utf8 import BytesLike, complete_utf8_length
+
+find_atom_end = compile(r"[,\]}]").search
+
+Path = Sequence[Union[str, int]]
+
+
+def find_member(json_string: str, start: int, key: str):
+    """the start of the value of `key` in the object opened at `start`"""
+
+    depth = 0
+
+    for match in tokenize(json_string, start + 1):
+        token = match.group()
+
+        if token in "[{":
+            depth += 1
+        elif token in "]}":
+            if depth == 0:
+                raise KeyError(key)
+            depth -= 1
+        elif depth == 0:
+            if not match.group(1):  # unterminated
+                break
+
+            colon = skip_whitespace(json_string, match.end())
+            if json_string[colon : colon + 1] == ":" and raw_decode(token)[0] == key:
+                return skip_whitespace(json_string, colon + 1)
+
+    raise PartialJSON(f"{key!r} is not available yet")
+
+
+def find_element(json_string: str, start: int, index: int):
+    """the start of the `index`-th element of the array opened at `start`"""
+
+    if index < 0:
+        raise ValueError("the length of a partial array is unknown, so negative indexes are not supported")
+
+    depth = 0
+    count = 0
+    cursor = start + 1
+
+    def gap(end: int):
+        """count the commas between `cursor` and `end`, and return the position after the `index`-th one if it is there"""
+
+        nonlocal count
+        position = cursor
+        while count < index:
+            position = json_string.find(",", position, end)
+            if position == -1:
+                return None
+            count += 1
+            position += 1
+        return position
+
+    for match in tokenize(json_string, start + 1):
+        if depth == 0:
+            position = gap(match.start())
+            if position is not None:
+                break
+
+        token = match.group()
+        if token in "[{":
+            depth += 1
+        elif token in "]}":
+            if depth == 0:
+                raise IndexError(index)
+            depth -= 1
+
+        cursor = match.end()
+
+    else:
+        if depth != 0:
+            raise PartialJSON(f"{index} is not available yet")
+        position = gap(len(json_string))
+        if position is None:
+            raise PartialJSON(f"{index} is not available yet")
+
+    position = skip_whitespace(json_string, position)
+    if json_string[position : position + 1] == "]":
+        raise IndexError(index)
+    return position
+
+
+def find_value_end(json_string: str, start: int) -> Optional[int]:
+    """the end of the value at `start`, or `None` if it is not complete yet"""
+
+    char = json_string[start]
+
+    if char in "[{":
+        depth = 0
+        for match in tokenize(json_string, start):
+            token = match.group()
+            if token in "[{":
+                depth += 1
+            elif token in "]}":
+                depth -= 1
+                if depth == 0:
+                    return match.end()
+        return None
+
+    if char == '"':
+        match = next(tokenize(json_string, start))
+        return match.end() if match.group(1) else None
+
+    match = find_atom_end(json_string, start)
+    return match.start() if match else None
+
+
+def parse_path(json_string: Union[str, BytesLike], path: Path, allow_partial: Union[Allow, int] = ALL, parser: Optional[Callable[..., JSON]] = None) -> JSON:
+    """
+    parse only the value at `path` (a sequence of keys and indexes) of a (partial) JSON string
+
+    The siblings on the way are skipped without being decoded, and `allow_partial` only applies to the selected value.
+    `PartialJSON` is raised if the value has not started yet, and `KeyError` or `IndexError` if its closed parent does not contain it.
+    """
+
+    if not isinstance(json_string, str):
+        data = bytes(json_string)
+        json_string = data[: complete_utf8_length(data)].decode()
+
+    if not path:
+        return parse_json(json_string, allow_partial, parser)
+
+    if parser is None:
+        from json import loads as parser
+
+    start = skip_whitespace(json_string, 0)
+
+    for step in path:
+        if start == len(json_string):
+            raise PartialJSON("the value has not started yet")
+
+        char = json_string[start]
+
+        if isinstance(step, str):
+            if char != "{":
+                raise TypeError(f"expected an object to get {step!r} from, got {char}")
+            start = find_member(json_string, start, step)
+        else:
+            if char != "[":
+                raise TypeError(f"expected an array to get {step} from, got {char}")
+            start = find_element(json_string, start, step)
+
+    if start == len(json_string):
+        raise PartialJSON("the value has not started yet")
+
+    end = find_value_end(json_string, start)
+    if end is not None:
+        return parser(json_string[start:end])
+
+    rest = json_string[start:]
+    head, tail = fix_fast(rest, allow_partial) if rest[0] in "[{" else _fix(rest, compile_allow(allow_partial))
+    return parser(head + tail)
@@ -0,0 +1,73 @@
+from typing import IO, Generic, TypeVar, Union
+
+from .complete import _cut
+from .myelin import cut_fast
+from .options import *
+from .utf8 import BytesLike, complete_utf8_length
+
+AnyStr = TypeVar("AnyStr", str, bytes)
+
+CHUNK_SIZE = 2**20  # how many characters `write_to` copies at a time
+
+
+class FixResult(Generic[AnyStr]):
+    """
+    The completion of a (partial) JSON string, kept as the offset to cut it at and the suffix to append instead of as a sliced copy
+
+    `head` and `text` are only built when they are accessed, and `write_to` writes the completed text without building it.
+    It unpacks to `(head, tail)`, like the result of `fix` and `fix_fast`.
+    """
+
+    __slots__ = ("source", "cut", "tail")
+
+    def __init__(self, source: AnyStr, cut: int, tail: AnyStr):
+        self.source = source
+        self.cut = cut
+        self.tail = tail
+
+    @property
+    def head(self) -> AnyStr:
+        return self.source[: self.cut]
+
+    @property
+    def text(self) -> AnyStr:
+        """the completed JSON string, the same as `ensure_json` returns"""
+
+        return self.head + self.tail
+
+    def __iter__(self):
+        return iter((self.head, self.tail))
+
+    def __len__(self):
+        return self.cut + len(self.tail)
+
+    def __repr__(self):
+        return f"FixResult(cut={self.cut}, tail={self.tail!r})"
+
+    def write_to(self, fileobj: IO, chunk_size=CHUNK_SIZE):
+        """write the completed text to `fileobj`, copying at most `chunk_size` characters of the source at a time, and return its length"""
+
+        if isinstance(self.source, bytes):
+            fileobj.write(memoryview(self.source)[: self.cut])  # no copy at all
+        else:
+            for start in range(0, self.cut, chunk_size):
+                fileobj.write(self.source[start : min(start + chunk_size, self.cut)])
+
+        fileobj.write(self.tail)
+        return len(self)
+
+
+def fix_lazy(json_string: Union[str, BytesLike], allow_partial: Union[Allow, int] = ALL, use_fast_fix=True) -> FixResult:
+    """the same as `fix_fast(json_string)` (or `fix` without `use_fast_fix`), but returning a `FixResult` which does not copy the head"""
+
+    allow = compile_allow(allow_partial)
+
+    if isinstance(json_string, str):
+        cut, tail = cut_fast(json_string, allow) if use_fast_fix else _cut(json_string, 0, allow, True)
+        return FixResult(json_string, cut, tail)
+
+    # see `fix_bytes`, every byte is decoded to exactly one character so that the offsets are byte offsets
+    data = bytes(json_string)
+    text = str(memoryview(data)[: complete_utf8_length(data)], "ascii", "surrogateescape")
+    cut, tail = cut_fast(text, allow) if use_fast_fix else _cut(text, 0, allow, True)
+    return FixResult(data, cut, tail.encode())
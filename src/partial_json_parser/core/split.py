@@ -0,0 +1,202 @@
+from codecs import getincrementaldecoder
+from json import loads
+from re import compile
+from typing import Callable, Iterable, Iterator, List, Optional, Union
+
+from .api import JSON, parse_json
+from .exceptions import MalformedJSON, PartialJSON
+from .incremental import raw_decode, skip_whitespace
+from .myelin import match_string_rest, tokenize
+from .options import *
+from .utf8 import BytesLike
+
+match_atom = compile(r'[^ \t\n\r,:\[\]{}"]+').match
+
+
+class BracketTracker:
+    """The nesting depth of a document being received, tracked from where the previous chunk stopped so that it is scanned only once"""
+
+    __slots__ = ("scanned", "depth", "in_string")
+
+    def __init__(self):
+        self.scanned = -1  # where the tracking stopped, or -1 if it has not started
+        self.depth = 0  # the nesting depth at `scanned`
+        self.in_string = False  # whether `scanned` is inside a string literal
+
+    def find_end(self, buffer: str) -> Optional[int]:
+        """track the brackets of the document in `buffer` from `scanned`, and get where it ends if it is complete"""
+
+        cursor = self.scanned
+        depth = self.depth
+
+        if self.in_string:  # resume inside the open string
+            match = match_string_rest(buffer, cursor)
+            assert match is not None  # always matches, maybe an empty string
+            if not match.group(1):
+                self.scanned = match.end()
+                return None
+
+            self.in_string = False
+            cursor = match.end()
+            if depth == 0:  # a top-level string
+                self.scanned = -1
+                return cursor
+
+        for match in tokenize(buffer, cursor):
+            token = match.group()
+
+            if token in "[{":
+                depth += 1
+            elif token in "]}":
+                depth -= 1
+            elif not match.group(1):  # only the last token can be an open string
+                self.in_string = True
+                self.depth = depth
+                self.scanned = match.end()
+                return None
+
+            if depth <= 0:
+                self.depth = 0
+                self.scanned = -1
+                return match.end()
+
+        self.depth = depth
+        self.scanned = len(buffer)
+        return None
+
+
+class DocumentSplitter:
+    """
+    Split the chunks of concatenated JSON documents, like JSON Lines, into the documents as they complete
+
+    Each document is first decoded directly, which succeeds as soon as it is complete. Otherwise its brackets and strings are tracked
+    from where the previous chunk stopped, so that a large document is not rescanned for every chunk, and it is decoded once it is closed.
+    """
+
+    def __init__(self, allow_partial: Union[Allow, int] = ALL, parser: Optional[Callable[..., JSON]] = None):
+        self.allow = compile_allow(allow_partial)
+        self.parser = parser
+        self.buffer = ""  # the unconsumed input, which starts with the current document
+        self.received = 0  # how long the input is in total, see `update`
+        self.tracker = BracketTracker()  # of the current document
+        self.decoder = getincrementaldecoder("utf-8")()
+
+    def feed(self, chunk: Union[str, BytesLike]) -> List[JSON]:
+        """
+        consume `chunk` and get the documents it completes
+
+        `MalformedJSON` is raised for a malformed document, which is consumed. The documents before it in the same chunk are returned first,
+        and the error is raised by the next call.
+        """
+
+        self.received += len(chunk)
+
+        if not isinstance(chunk, str):
+            chunk = self.decoder.decode(chunk)
+
+        buffer = self.buffer
+        self.buffer = ""  # so that the concatenation below may happen in place
+        buffer += chunk
+        length = len(buffer)
+        documents: List[JSON] = []
+        tracker = self.tracker
+        start = 0
+
+        try:
+            while True:
+                start = skip_whitespace(buffer, start)
+                if start == length:
+                    break
+
+                if buffer[start] in '[{"':
+                    if tracker.scanned == -1:  # try decoding the document at once
+                        try:
+                            document, end = raw_decode(buffer, start)
+                        except ValueError:  # incomplete or malformed
+                            tracker.scanned = start
+                        else:
+                            if self.parser is not None:
+                                document = self.parser(buffer[start:end])
+                            documents.append(document)
+                            start = end
+                            continue
+
+                    end = tracker.find_end(buffer)
+                    if end is None:
+                        break
+
+                else:
+                    match = match_atom(buffer, start)
+                    if match is None:
+                        if documents:  # left for the next call
+                            break
+                        start += 1  # skip it
+                        raise MalformedJSON(f"Unexpected character {buffer[start - 1]}")
+                    end = match.end()
+                    if end == length:  # it may continue in the next chunk
+                        break
+
+                try:
+                    document = self.decode(buffer[start:end])
+                except ValueError:
+                    if documents:  # left for the next call, which decodes it again
+                        break
+                    start = end  # a malformed document is consumed as well
+                    raise
+
+                start = end
+                documents.append(document)
+
+        finally:
+            if tracker.scanned != -1:
+                tracker.scanned -= start
+            self.buffer = buffer[start:] if start else buffer
+
+        return documents
+
+    def update(self, buffer: Union[str, BytesLike]):
+        """feed the part of a growing `buffer` which has not been fed yet, and get the documents it completes"""
+
+        return self.feed(buffer[self.received :])
+
+    def decode(self, document: str) -> JSON:
+        if self.parser is not None:
+            return self.parser(document)
+
+        try:
+            return loads(document)
+        except ValueError as err:
+            raise MalformedJSON(*err.args) from err
+
+    def partial(self) -> JSON:
+        """
+        the incomplete document at the end of the input so far, completed as `parse_json` does
+
+        `PartialJSON` is raised if there is none, or if it is not allowed to be partial.
+        """
+
+        if not self.buffer.strip():
+            raise PartialJSON("there is no incomplete document")
+
+        return parse_json(self.buffer, self.allow, self.parser)
+
+    def close(self) -> List[JSON]:
+        """end the input, and get the incomplete document at its end (if any) completed as `parse_json` does"""
+
+        documents = self.feed("")  # the documents left behind a malformed one, if any
+        if self.buffer.strip():
+            documents.append(self.partial())
+        self.buffer = ""
+        self.tracker = BracketTracker()
+        return documents
+
+
+def split_documents(
+    chunks: Iterable[Union[str, BytesLike]], allow_partial: Union[Allow, int] = ALL, parser: Optional[Callable[..., JSON]] = None
+) -> Iterator[JSON]:
+    """turn an iterable of chunks of concatenated JSON documents into an iterator of documents, see `DocumentSplitter`"""
+
+    splitter = DocumentSplitter(allow_partial, parser)
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    yield from splitter.close()
@@ -0,0 +1,103 @@
+from re import compile
+from time import monotonic
+from typing import AsyncIterable, AsyncIterator, Optional, Union
+
+from .api import JSON
+from .exceptions import PartialJSON
+from .incremental import IncrementalParser
+from .options import *
+from .utf8 import BytesLike
+
+find_boundary = compile(r'[,\]}"]').search
+
+
+def is_blank(buffer: str):
+    """whether nothing but whitespace has arrived, which `parse_json` would reject as malformed"""
+
+    return not buffer or buffer.isspace()
+
+
+class JSONStream:
+    """
+    Parse a stream of chunks, only reparsing when the coalescing policy allows
+
+    A reparse is triggered once both `min_chars` characters and `min_interval` seconds have passed since the previous one,
+    or by any chunk containing `,`, `]`, `}` or `"` if `on_boundary` is set. The final value is always yielded.
+    """
+
+    def __init__(
+        self,
+        chunks: AsyncIterable[Union[str, BytesLike]],
+        allow_partial: Union[Allow, int] = ALL,
+        min_chars=0,
+        min_interval=0.0,
+        on_boundary=False,
+        numeric_arrays: Optional[str] = None,
+    ):
+        self.chunks = chunks
+        self.parser = IncrementalParser(allow_partial, numeric_arrays)
+        self.min_chars = min_chars
+        self.min_interval = min_interval
+        self.on_boundary = on_boundary
+        self.iterator = self.iterate()
+
+    def __aiter__(self) -> AsyncIterator[JSON]:
+        return self.iterator
+
+    async def iterate(self):
+        parser = self.parser
+        parsed_length = 0
+        parsed_at = monotonic()
+
+        async for chunk in self.chunks:
+            length = len(parser.buffer)
+            parser.append(chunk)
+            if is_blank(parser.buffer):  # nothing to parse yet
+                continue
+
+            due = len(parser.buffer) - parsed_length >= self.min_chars and monotonic() - parsed_at >= self.min_interval
+            if not due and not (self.on_boundary and find_boundary(parser.buffer, length)):
+                continue
+
+            try:
+                value = parser.parse_json()
+            except PartialJSON:
+                continue
+
+            parsed_length = len(parser.buffer)
+            parsed_at = monotonic()
+            yield value
+
+        if parsed_length != len(parser.buffer) and not is_blank(parser.buffer):
+            try:
+                yield parser.parse_json()
+            except PartialJSON:
+                pass
+
+    async def result(self) -> JSON:
+        """consume the rest of the stream and get the final value, which must be complete"""
+
+        async for _ in self.iterator:
+            pass
+
+        if is_blank(self.parser.buffer):
+            raise PartialJSON("the stream is empty")
+
+        head, tail = self.parser.fix()
+        if tail or self.parser.buffer[len(head) :].strip():
+            raise PartialJSON("the stream ended before the JSON is complete")
+
+        return self.parser.parse_json()
+
+
+def parse_stream(
+    chunks: AsyncIterable[Union[str, BytesLike]],
+    allow_partial: Union[Allow, int] = ALL,
+    min_chars=0,
+    min_interval=0.0,
+    on_boundary=False,
+    numeric_arrays: Optional[str] = None,
+) -> JSONStream:
+    """parse an async iterable of chunks into an async iterable of partial values"""
+
+    return JSONStream(chunks, allow_partial, min_chars, min_interval, on_boundary, numeric_arrays)
@@ -0,0 +1,34 @@
+from typing import Callable, Tuple, Union
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def complete_utf8_length(data: bytes):
+    """the length of `data` without a truncated multi-byte sequence at its end"""
+
+    length = len(data)
+
+    for size in range(1, min(4, length) + 1):
+        byte = data[length - size]
+        if byte < 0x80:  # ASCII
+            return length
+        if byte >= 0xC0:  # leading byte of a sequence
+            expected = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return length if size >= expected else length - size
+
+    return length
+
+
+def fix_bytes(fixer: Callable[[str, int], Tuple[str, str]], json_string: BytesLike, allow_partial: int):
+    """
+    run a `fixer` on UTF-8 encoded input
+
+    Every byte is decoded to exactly one character (non-ASCII bytes become lone surrogates), so the indices the fixer computes are byte offsets
+    and the head can be sliced from the input itself. The completion only consists of ASCII characters.
+    """
+
+    data = bytes(json_string)
+    data = data[: complete_utf8_length(data)]
+
+    head, tail = fixer(data.decode("ascii", "surrogateescape"), allow_partial)
+    return data[: len(head)], tail.encode()
@@ -0,0 +1,23 @@
+from argparse import ArgumentParser
+from functools import reduce
+from operator import or_
+
+from partial_json_parser import Allow, fix_file, repair_file
+
+
+def main(argv=None):
+    parser = ArgumentParser(prog="json-repair", description="Complete a truncated JSON file in place, without reading it into memory.")
+    parser.add_argument("file", help="the JSON file to complete")
+    parser.add_argument("-o", "--output", help="write the completed JSON to this file instead, leaving FILE untouched")
+    parser.add_argument("-a", "--allow", default="ALL", help="what may be partial, as names of `Allow` joined by '|' (default: ALL)")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="only show where the file would be cut and what would be appended")
+    args = parser.parse_args(argv)
+
+    allow = reduce(or_, (Allow[name.strip()] for name in args.allow.split("|")))
+
+    if args.dry_run:
+        cut, tail = fix_file(args.file, allow)
+    else:
+        cut, tail = repair_file(args.file, allow, args.output)
+
+    print(f"cut at byte {cut} and appended {tail.decode()!r}" if not args.dry_run else f"would cut at byte {cut} and append {tail.decode()!r}")
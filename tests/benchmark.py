@@ -0,0 +1,186 @@
+"""
+Reproducible benchmarks on fixed corpora
+
+    pdm benchmark --output results.json
+    pdm benchmark --compare baseline.json --threshold 0.2
+
+Every corpus is generated from a fixed seed. Each function is timed under every `Allow` profile (the best of `--repeat` runs),
+and its peak memory is measured separately with `tracemalloc`. The comparison mode exits with 1 if any measurement
+regresses beyond the threshold.
+"""
+
+from argparse import ArgumentParser
+from json import dump, dumps, load
+from platform import platform, python_implementation, python_version
+from random import Random
+from sys import exit
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+
+from partial_json_parser import (
+    ALL,
+    ARR,
+    ATOM,
+    COLLECTION,
+    NUM,
+    OBJ,
+    SPECIAL,
+    STR,
+    Allow,
+    ensure_json,
+    fix,
+    fix_fast,
+    parse_json,
+)
+
+SEED = 42
+
+PROFILES = {
+    "ALL": ALL,
+    "ATOM": ATOM,
+    "COLLECTION": COLLECTION,
+    "STR|OBJ": STR | OBJ,
+    "NUM|ARR": NUM | ARR,
+    "SPECIAL|ARR": SPECIAL | ARR,
+    "NONE": Allow(0),
+}
+
+FUNCTIONS = {"fix": fix, "fix_fast": fix_fast, "ensure_json": ensure_json, "parse_json": parse_json}
+
+
+def deep_object(random: Random, depth: int):
+    value = random.random()
+    for i in range(depth):
+        value = {f"level{i}": value, "sibling": [random.randint(0, 100), None]} if i % 2 else [value, str(i)]
+    return dumps(value)
+
+
+def long_string(random: Random, size: int):
+    text = "".join(random.choice('abcdefghij klmnopqrstuvwxyz\n"\\é') for _ in range(size // 4)) * 4
+    return dumps({"text": text})
+
+
+def numeric_array(random: Random, length: int):
+    return dumps([random.choice((random.randint(-(10**9), 10**9), random.uniform(-1e6, 1e6))) for _ in range(length)])
+
+
+def key_heavy(random: Random, length: int):
+    return dumps([{f"key_{random.randint(0, 999)}_{j}": random.choice(("value", 1, True, None)) for j in range(10)} for _ in range(length)])
+
+
+def tool_call(random: Random, length: int):
+    arguments = {"query": " ".join(random.choice(("search", "weather", "in", "the", "city", "of")) for _ in range(40)), "limit": 10}
+    arguments["filters"] = [{"field": f"f{i}", "op": random.choice(("eq", "lt", "gt")), "value": random.randint(0, 99)} for i in range(length)]
+    return dumps({"name": "search", "arguments": arguments}, indent=2)
+
+
+def build_corpora(scale: float):
+    random = Random(SEED)
+
+    def truncate(json_string: str):
+        return json_string[: random.randint(len(json_string) // 2, len(json_string) - 1)]
+
+    corpora = {
+        "deep": [truncate(deep_object(random, 100))],
+        "long_string": [truncate(long_string(random, int(2**20 * scale)))],
+        "numeric_array": [truncate(numeric_array(random, int(50_000 * scale)))],
+        "key_heavy": [truncate(key_heavy(random, int(5_000 * scale)))],
+    }
+
+    # replay a tool call token by token, as an LLM streams it
+    json_string = tool_call(random, int(30 * scale) or 1)
+    ends = []
+    end = 0
+    while end < len(json_string):
+        end += random.randint(1, 6)
+        ends.append(end)
+    corpora["stream"] = [json_string[:end] for end in ends]
+
+    return corpora
+
+
+def run(function, json_strings, allow):
+    for json_string in json_strings:
+        try:
+            function(json_string, allow)
+        except ValueError:  # PartialJSON and MalformedJSON are valid outcomes too
+            pass
+
+
+def measure(function, json_strings, allow, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        t = perf_counter()
+        run(function, json_strings, allow)
+        best = min(best, perf_counter() - t)
+
+    start()
+    run(function, json_strings, allow)
+    peak = get_traced_memory()[1]
+    stop()
+
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def benchmark(scale: float, repeat: int):
+    corpora = build_corpora(scale)
+    results = {}
+
+    for corpus, json_strings in corpora.items():
+        for name, function in FUNCTIONS.items():
+            for profile, allow in PROFILES.items():
+                key = f"{corpus}/{name}/{profile}"
+                results[key] = result = measure(function, json_strings, allow, repeat)
+                print(f" {key:<40} {result['seconds'] * 1000:>10.2f} ms {result['peak_bytes'] / 2**20:>8.2f} MiB")
+
+    meta = {"seed": SEED, "scale": scale, "python": f"{python_implementation()} {python_version()}", "platform": platform()}
+    return {"meta": meta, "results": results}
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_seconds: float):
+    regressions = []
+
+    for key, result in results["results"].items():
+        if key not in baseline["results"]:
+            continue
+        base = baseline["results"][key]
+
+        if result["seconds"] > min_seconds and result["seconds"] > base["seconds"] * (1 + threshold):
+            regressions.append(f"{key}: {base['seconds'] * 1000:.2f} ms -> {result['seconds'] * 1000:.2f} ms")
+        if result["peak_bytes"] > 2**16 and result["peak_bytes"] > base["peak_bytes"] * (1 + threshold):
+            regressions.append(f"{key}: {base['peak_bytes'] / 2**20:.2f} MiB -> {result['peak_bytes'] / 2**20:.2f} MiB")
+
+    return regressions
+
+
+def main(argv=None):
+    parser = ArgumentParser(description="run the benchmarks on fixed corpora")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="the tolerated relative regression (default: 0.2)")
+    parser.add_argument("--min-seconds", type=float, default=1e-4, help="ignore timing regressions below this (default: 1e-4)")
+    parser.add_argument("--scale", type=float, default=1.0, help="scale the size of the corpora (default: 1)")
+    parser.add_argument("--repeat", type=int, default=3, help="take the best of this many runs (default: 3)")
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.scale, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = load(f)
+
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print()
+            print(f" {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"   {regression}")
+            exit(1)
+
+
+if __name__ == "__main__":
+    main()
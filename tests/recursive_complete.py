@@ -0,0 +1,117 @@
+"""
+The recursive implementation of the slow engine, which `complete_collection` replaced
+
+It is kept as a reference for the consistency tests and the benchmarks.
+"""
+
+from partial_json_parser.core.complete import (
+    CompleteResult,
+    complete_atom,
+    complete_str,
+    skip_blank,
+)
+from partial_json_parser.core.exceptions import MalformedJSON, PartialJSON
+from partial_json_parser.core.options import *
+
+
+def fix(json_string: str, allow_partial=ALL):
+    allow = compile_allow(allow_partial)
+    try:
+        result = complete_any(json_string.rstrip(), skip_blank(json_string, 0), allow, True)
+        if result is False:
+            raise PartialJSON
+
+        index, completion = result
+        return json_string[:index], ("" if completion is True else completion)
+
+    except (AssertionError, IndexError) as err:
+        raise MalformedJSON(*err.args) from err
+
+
+def complete_any(json_string: str, index: int, allow: Profile, is_top_level=False) -> CompleteResult:
+    char = json_string[index]
+
+    if char == "[":
+        return complete_arr(json_string, index, allow)
+
+    if char == "{":
+        return complete_obj(json_string, index, allow)
+
+    return complete_atom(json_string, index, allow, is_top_level)
+
+
+def complete_arr(json_string: str, index: int, allow: Profile) -> CompleteResult:
+    assert json_string[index] == "["
+    i = j = index + 1
+
+    try:
+        while True:
+            j = skip_blank(json_string, j)
+
+            if json_string[j] == "]":
+                return j + 1, True
+
+            result = complete_any(json_string, j, allow)
+
+            if result is False:  # incomplete
+                return (i, "]") if ARR in allow else False
+            if result[1] is True:  # complete
+                i = j = result[0]
+            else:  # incomplete
+                return (result[0], result[1] + "]") if ARR in allow else False
+
+            j = skip_blank(json_string, j)
+
+            if json_string[j] == ",":
+                j += 1
+            elif json_string[j] == "]":
+                return j + 1, True
+            else:
+                raise MalformedJSON(f"Expected ',' or ']', got {json_string[j]}")
+    except IndexError:
+        return (i, "]") if ARR in allow else False
+
+
+def complete_obj(json_string: str, index: int, allow: Profile) -> CompleteResult:
+    assert json_string[index] == "{"
+    i = j = index + 1
+
+    try:
+        while True:
+            j = skip_blank(json_string, j)
+
+            if json_string[j] == "}":
+                return j + 1, True
+
+            result = complete_str(json_string, j, allow)
+            if result and result[1] is True:  # complete
+                j = result[0]
+            else:  # incomplete
+                return (i, "}") if OBJ in allow else False
+
+            j = skip_blank(json_string, j)
+
+            if json_string[j] != ":":
+                raise MalformedJSON(f"Expected ':', got {json_string[j]}")
+            j += 1
+
+            j = skip_blank(json_string, j)
+
+            result = complete_any(json_string, j, allow)
+            if result is False:  # incomplete
+                return (i, "}") if OBJ in allow else False
+            if result[1] is True:  # complete
+                i = j = result[0]
+            else:  # incomplete
+                return (result[0], result[1] + "}") if OBJ in allow else False
+
+            j = skip_blank(json_string, j)
+
+            if json_string[j] == ",":
+                j += 1
+            elif json_string[j] == "}":
+                return j + 1, True
+            else:
+                raise MalformedJSON(f"Expected ',' or '}}', got {json_string[j]}")
+    except IndexError:
+        return (i, "}") if OBJ in allow else False
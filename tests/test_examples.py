@@ -1,13 +1,15 @@
 from itertools import accumulate
-from json import dumps
+from json import dumps, loads
 from math import isnan
 
+import recursive_complete
 from hypothesis import given, settings
-from hypothesis.strategies import integers
+from hypothesis.strategies import data, integers, sampled_from
 from pytest import raises
 from test_hypotheses import json
 
 from partial_json_parser import *
+from partial_json_parser.core.myelin import ScanState
 from partial_json_parser.core.options import *
 
 
@@ -20,6 +22,9 @@ def test_str():
     assert parse_json(r'"\\u') == "\\u"
     assert parse_json(r'"\\U\\u') == "\\U\\u"
 
+    assert parse_json('"café'.encode()[:-1]) == "caf"
+    assert ensure_json(bytearray('["日本'.encode()[:-2])) == '["日"]'.encode()
+
 
 def test_arr():
     assert parse_json('["', ARR) == []
@@ -111,6 +116,9 @@ def test_fix_fast():
     assert fix_fast('["a","b', ~STR) == ('["a"', "]")
     assert fix_fast('["a" ,"b', ~STR) == ('["a" ', "]")
 
+    assert fix_fast(r'["\\", "[\"{') == (r'["\\", "[\"{', '"]')
+    assert fix_fast('{"a\\\\\\"]": "}\\') == (r'{"a\\\"]": "}', '"}')
+
 
 def consistent(json_string, allow):
     try:
@@ -139,3 +147,831 @@ def test_consistency():
 def test_consistencies(json_string, allow):
     for json_string in accumulate(json_string):
         assert consistent(json_string, allow), f"{Allow(allow)!r} - {json_string}"
+
+
+def incrementally_consistent(json_string, allow, step=1):
+    parser = IncrementalParser(allow)
+    for end in range(step, len(json_string) + step, step):
+        chunk = json_string[end - step : end]
+        try:
+            expected = ensure_json(json_string[:end], allow)
+        except PartialJSON:
+            with raises(PartialJSON):
+                parser.feed(chunk)
+        else:
+            if parser.feed(chunk) != expected:
+                return False
+    return True
+
+
+@settings(deadline=None)
+@given(json.map(dumps), integers(0, ALL).map(Allow), integers(1, 5))
+def test_incremental_consistencies(json_string, allow, step):
+    assert incrementally_consistent(json_string, allow, step), f"{Allow(allow)!r} - {json_string}"
+
+
+@settings(deadline=None)
+@given(json.map(dumps), integers(0, ALL).map(Allow), integers(1, 5))
+def test_incremental_parse_json(json_string, allow, step):
+    parser = IncrementalParser(allow)
+    for end in range(step, len(json_string) + step, step):
+        parser.append(json_string[end - step : end])
+        try:
+            expected = parse_json(json_string[:end], allow)
+        except PartialJSON:
+            with raises(PartialJSON):
+                parser.parse_json()
+        else:
+            assert str(parser.parse_json()) == str(expected), f"{Allow(allow)!r} - {json_string[:end]}"
+
+
+def test_incremental_in_place():
+    from array import array
+
+    parser = IncrementalParser()
+    parser.append('{"a": 1, "a": 2, "b": [1, {"c": "x')
+    value = parser.parse_json()
+    assert value == {"a": 2, "b": [1, {"c": "x"}]}
+
+    parser.append('yz"}, 3, ')  # the open containers are updated in place
+    assert parser.parse_json() is value == {"a": 2, "b": [1, {"c": "xyz"}, 3]}
+
+    parser.append('4], "a": 5, "d": "')
+    assert parser.parse_json() is value == {"a": 5, "b": [1, {"c": "xyz"}, 3, 4], "d": ""}
+    parser.append('e", "a')  # the partial key is dropped, and the previous value of "a" is kept
+    assert parser.parse_json() is value == {"a": 5, "b": [1, {"c": "xyz"}, 3, 4], "d": "e"}
+
+    parser = IncrementalParser(numeric_arrays="array")
+    parser.append("[1, 2, 3")
+    numbers = parser.parse_json()
+    parser.append("4, 5")
+    assert parser.parse_json() is numbers == array("q", [1, 2, 34, 5])
+    parser.append(".5")
+    assert parser.parse_json() == array("d", [1, 2, 34, 5.5])  # a new array, as the type code changed
+
+
+@settings(deadline=None)
+@given(json.map(lambda x: dumps(x, ensure_ascii=False)), integers(0, ALL).map(Allow))
+def test_bytes(json_string, allow):
+    data = json_string.encode()
+    parser = IncrementalParser(allow)
+
+    for end in range(1, len(data) + 1):
+        text = data[:end].decode(errors="ignore")  # drop the truncated character at the end
+        parser.append(data[end - 1 : end])
+        assert parser.buffer == text
+
+        if text.rstrip() != text.rstrip(" \t\n\r"):
+            continue  # `str.rstrip` also strips non-ASCII whitespace, which stays undecoded in bytes
+
+        for fixer in (fix, fix_fast):
+            try:
+                head, tail = fixer(text, allow)
+            except PartialJSON:
+                with raises(PartialJSON):
+                    fixer(data[:end], allow)
+            else:
+                assert fixer(bytearray(data[:end]), allow) == (head.encode(), tail.encode())
+                assert fixer(memoryview(data)[:end], allow) == (head.encode(), tail.encode())
+
+
+def test_parse_stream():
+    from asyncio import run
+    from copy import deepcopy
+
+    async def chunks(json_string: str, step=3):
+        for i in range(0, len(json_string), step):
+            yield json_string[i : i + step]
+
+    async def collect(stream: JSONStream):
+        return [deepcopy(value) async for value in stream], await stream.result()  # the open containers are updated in place
+
+    json_string = dumps({"key": ["value", 12, {"k": None}], "text": "a b c d e f g h"})
+
+    values, result = run(collect(parse_stream(chunks(json_string))))
+    assert len(values) == len(range(0, len(json_string), 3))
+    assert values[-1] == result == parse_json(json_string)
+
+    values, result = run(collect(parse_stream(chunks(json_string), min_chars=20)))
+    assert len(values) == len(json_string) // 21 + 1
+    assert values[-1] == result
+
+    values, result = run(collect(parse_stream(chunks(json_string), min_chars=1000, on_boundary=True)))
+    assert values == [parse_json(json_string[: i + 3]) for i in range(0, len(json_string), 3) if any(c in json_string[i : i + 3] for c in ',]}"')]
+
+    with raises(PartialJSON):
+        run(parse_stream(chunks(json_string[:-1])).result())
+
+    for blank in ("", " \n "):
+        with raises(PartialJSON):
+            run(parse_stream(chunks(blank)).result())
+
+    values, result = run(collect(parse_stream(chunks(" \n [1, 2]", step=1))))
+    assert values[0] == [] and result == [1, 2]  # the leading blanks are not parsed on their own
+
+
+def test_parse_many():
+    json_strings = ['{"key": "v', "[1, 2", '"', "wrong", '{"key": [true, nu', "-"] * 10
+
+    for workers in (0, 2):
+        results = list(parse_many(json_strings, ~STR, workers=workers, chunksize=4))
+        assert len(results) == len(json_strings)
+
+        for json_string, result in zip(json_strings, results):
+            try:
+                assert result == parse_json(json_string, ~STR)
+            except (PartialJSON, MalformedJSON) as err:
+                assert type(result) is type(err)
+
+        unordered = sorted(parse_many(json_strings, ~STR, workers=workers, chunksize=4, ordered=False), key=lambda pair: pair[0])
+        assert [str(result) for _, result in unordered] == [str(result) for result in results]
+
+        results = list(parse_many([b"[1, 2", b'["\xff\xfe"]', "[" * 100_000 + "]" * 100_000, "[3"], workers=workers))
+        assert results[0] == [1, 2] and results[3] == [3]
+        assert isinstance(results[1], MalformedJSON) and isinstance(results[2], MalformedJSON)  # invalid UTF-8, and too deeply nested
+
+
+@settings(deadline=None)
+@given(json.map(dumps), integers(0, ALL).map(Allow))
+def test_prefix_cache(json_string, allow):
+    cache = enable_prefix_cache(maxsize=4, min_length=2)
+    try:
+        for json_string in accumulate(json_string):
+            assert consistent(json_string, allow), f"{Allow(allow)!r} - {json_string}"
+    finally:
+        disable_prefix_cache()
+
+    assert cache.info()["entries"] <= 4
+    if len(json_string) > 2:
+        assert cache.hits == len(json_string) - 2
+
+
+@settings(deadline=None)
+@given(json.map(dumps), integers(0, ALL).map(Allow))
+def test_auto_dispatch(json_string, allow):
+    for json_string in accumulate(json_string):
+        try:
+            expected = parse_json(json_string, allow)
+        except PartialJSON:
+            with raises(PartialJSON):
+                parse_json(json_string, allow, use_fast_fix="auto")
+        else:
+            assert str(parse_json(json_string, allow, use_fast_fix="auto")) == str(expected)
+            assert ensure_json(json_string, allow, use_fast_fix="auto") == ensure_json(json_string, allow)
+
+
+def test_calibrate():
+    dispatcher = Dispatcher()
+    samples = list(accumulate(dumps([{"key": [i, str(i), None]} for i in range(20)])))
+    size = dispatcher.calibrate(samples[::7], number=3)
+    assert dispatcher.small_size == size
+    assert 0 <= size <= len(samples[-1]) + 1
+
+
+def test_instrumentation():
+    stats = enable_instrumentation()
+    try:
+        assert fix_fast('[1, "a') == ('[1, "a', '"]')
+        assert fix_fast('{"a": [1], "b') == ('{"a": [1]', "}")
+        assert fix_fast("123") == ("123", "")
+        assert fix_fast("[]") == ("[]", "")
+    finally:
+        disable_instrumentation()
+
+    assert fix_fast("[") == ("[", "]")
+    snapshot = stats.snapshot()
+
+    assert snapshot["calls"] == 4
+    assert snapshot["branches"] == {"partial string in array": 1, "partial key after comma": 1, "top-level atom": 1, "complete": 1}
+    assert snapshot["slow_calls"] == 2  # the open string in the array is cut without the slow engine
+    assert snapshot["slow_chars"] == len(' "b') + len("123")
+    assert snapshot["scan_seconds"] > 0 and snapshot["resolve_seconds"] >= snapshot["slow_seconds"] > 0
+
+    stats.reset()
+    assert stats.snapshot()["calls"] == 0
+
+
+def outcome(fixer, json_string, allow):
+    try:
+        return fixer(json_string, allow)
+    except ValueError as err:
+        return type(err), err.args
+
+
+@settings(deadline=None)
+@given(json.map(dumps), integers(0, ALL).map(Allow))
+def test_iterative_engine(json_string, allow):
+    for json_string in (*accumulate(json_string), json_string + "]", json_string[:-1] + ":", json_string[:-1] + " x"):
+        assert outcome(fix, json_string, allow) == outcome(recursive_complete.fix, json_string, allow), f"{Allow(allow)!r} - {json_string}"
+
+
+def test_deep_nesting():
+    depth = 10_000
+    json_string = '{"a": [' * depth + '"b'
+    assert fix(json_string) == (json_string, '"' + "]}" * depth)
+    assert fix(json_string, OBJ | STR) == ("{", "}")
+    assert fix_fast(json_string) == fix(json_string)
+
+
+def paths(value, path=()):
+    yield path
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from paths(child, (*path, key))
+    elif isinstance(value, list):
+        for index, child in enumerate(value):
+            yield from paths(child, (*path, index))
+
+
+def select(value, path):
+    for step in path:
+        value = value[step]
+    return value
+
+
+@settings(deadline=None)
+@given(json, data())
+def test_parse_path(value, data):
+    json_string = dumps(value)
+    path = data.draw(sampled_from(list(paths(value))))
+
+    for json_string in accumulate(json_string):
+        try:
+            expected = select(parse_json(json_string), path)
+        except (PartialJSON, KeyError, IndexError, TypeError):
+            with raises((PartialJSON, KeyError, IndexError)):
+                parse_path(json_string, path)
+        else:
+            assert str(parse_path(json_string, path)) == str(expected), f"{path} - {json_string}"
+
+
+def test_parse_path_examples():
+    json_string = '{"name": "search", "arguments": {"filters": [{"id": 1}, {"id": 2}], "query": "weath'
+    assert parse_path(json_string, ["arguments", "query"]) == "weath"
+    assert parse_path(json_string, ["arguments", "filters", 1]) == {"id": 2}
+    assert parse_path(json_string.encode(), ["name"]) == "search"
+
+    with raises(PartialJSON):
+        parse_path(json_string, ["arguments", "query"], ~STR)  # the rules only apply to the selected value
+    with raises(PartialJSON):
+        parse_path(json_string, ["arguments", "limit"])  # may still arrive
+    with raises(KeyError):
+        parse_path(json_string, ["arguments", "filters", 0, "name"])
+    with raises(IndexError):
+        parse_path(json_string, ["arguments", "filters", 2])
+    with raises(TypeError):
+        parse_path(json_string, ["name", 0])
+
+
+def build(events):
+    stack = [[]]
+    keys = []
+    for name, value in events:
+        if name in ("start_array", "start_object"):
+            stack.append([] if name == "start_array" else {})
+        elif name == "key":
+            keys.append(value)
+        elif name not in ("partial_string", "string_delta"):
+            if name != "value":
+                value = stack.pop()
+            if isinstance(stack[-1], dict):
+                stack[-1][keys.pop()] = value
+            else:
+                stack[-1].append(value)
+    [value] = stack[0]
+    return value
+
+
+@settings(deadline=None)
+@given(json.map(dumps), integers(0, ALL).map(Allow), integers(1, 5))
+def test_events(json_string, allow, step):
+    chunks = [json_string[i : i + step] for i in range(0, len(json_string), step)]
+    assert str(build(parse_events(chunks, allow))) == str(loads(json_string))
+
+    for end in range(1, len(json_string)):
+        try:
+            expected = parse_json(json_string[:end], allow)
+        except JSONDecodeError:
+            with raises(JSONDecodeError):
+                build(parse_events([json_string[:end]], allow))
+            continue
+
+        try:
+            value = build(parse_events([json_string[:end]], allow))
+        except PartialJSON:  # an open container is not allowed
+            assert ARR not in allow or OBJ not in allow
+        else:
+            assert str(value) == str(expected), f"{Allow(allow)!r} - {json_string[:end]}"
+
+
+def test_events_examples():
+    parser = EventParser()
+    assert parser.feed('{"rows": [1, "t') == [("start_object", None), ("key", "rows"), ("start_array", None), ("value", 1), ("partial_string", "t")]
+    assert parser.feed('wo", tr') == [("value", "two")]
+    assert parser.buffer == "tr"
+    assert parser.close() == [("value", True), ("end_array", None), ("end_object", None)]
+
+    parser = EventParser(~NUM)
+    events = parser.feed("[[0\n")
+    assert events == [("start_array", None), ("start_array", None)]  # the number may continue, as blanks are stripped
+    assert build(events + parser.feed("") + parser.close()) == parse_json("[[0\n", ~NUM) == [[]]
+    parser = EventParser(~NUM)
+    assert parser.feed("[[0\n") + parser.feed(" ]") == [("start_array", None), ("start_array", None), ("value", 0), ("end_array", None)]
+
+    with raises(PartialJSON):
+        list(parse_events(['{"rows": [1'], ~ARR))
+    with raises(MalformedJSON):
+        list(parse_events(['{"a" 1}']))
+
+
+@settings(deadline=None)
+@given(json.map(lambda x: dumps(x, ensure_ascii=False)), integers(0, ALL).map(Allow), integers(1, 5))
+def test_string_deltas(json_string, allow, step):
+    chunks = [json_string[i : i + step] for i in range(0, len(json_string), step)]
+    events = list(parse_events(chunks, allow, deltas=True))
+    assert str(build(events)) == str(loads(json_string))
+
+    path = []
+    text = ""
+    for name, value in events:
+        if name in ("start_array", "start_object"):
+            path.append(0 if name == "start_array" else None)
+        elif name in ("end_array", "end_object"):
+            path.pop()
+            if path and isinstance(path[-1], int):
+                path[-1] += 1
+        elif name == "key":
+            path[-1] = value
+        elif name == "string_delta":
+            assert value[0] == tuple(path)
+            text += value[1]
+        else:
+            assert text == (value if isinstance(value, str) else "")
+            text = ""
+            if path and isinstance(path[-1], int):
+                path[-1] += 1
+
+
+def test_string_deltas_examples():
+    parser = EventParser(deltas=True)
+    assert parser.feed('{"content": "Hel') == [("start_object", None), ("key", "content"), ("string_delta", (("content",), "Hel"))]
+    assert parser.feed("lo \\u00") == [("string_delta", (("content",), "lo "))]  # the escape is not complete yet
+    assert parser.feed("e9 \\ud83d") == [("string_delta", (("content",), "é "))]  # the low surrogate may follow
+    assert parser.feed('\\ude00", "parts": ["a') == [
+        ("string_delta", (("content",), "😀")),
+        ("value", "Hello é 😀"),
+        ("key", "parts"),
+        ("start_array", None),
+        ("string_delta", (("parts", 0), "a")),
+    ]
+    assert parser.close() == [("value", "a"), ("end_array", None), ("end_object", None)]
+
+
+@settings(deadline=None)
+@given(json.map(dumps), integers(0, ALL).map(Allow), sampled_from([0, 4096]))
+def test_parse_direct(json_string, allow, large):
+    from partial_json_parser.core import direct
+
+    direct.LARGE, default = large, direct.LARGE  # with 0, every member is decoded in place
+    try:
+        for json_string in accumulate(json_string):
+            try:
+                expected = parse_json(json_string, allow)
+            except PartialJSON:
+                with raises(PartialJSON):
+                    parse_direct(json_string, allow)
+            else:
+                assert str(parse_direct(json_string, allow)) == str(expected), f"{Allow(allow)!r} - {json_string}"
+    finally:
+        direct.LARGE = default
+
+
+@settings(deadline=None)
+@given(json.map(dumps), integers(0, ALL).map(Allow), data())
+def test_fix_lazy(json_string, allow, data):
+    from io import BytesIO, StringIO
+
+    ends = sorted({data.draw(integers(1, len(json_string))) for _ in range(5)} | {len(json_string)})  # a few prefixes, as every one is slow
+
+    for json_string in (json_string[:end] for end in ends):
+        for use_fast_fix, fixer in ((True, fix_fast), (False, fix)):
+            try:
+                expected = fixer(json_string, allow)
+            except PartialJSON:
+                with raises(PartialJSON):
+                    fix_lazy(json_string, allow, use_fast_fix)
+                continue
+
+            result = fix_lazy(json_string, allow, use_fast_fix)
+            assert tuple(result) == expected
+            assert result.text == "".join(expected) and len(result) == len(result.text)
+
+            file = StringIO()
+            assert result.write_to(file, chunk_size=3) == len(result)
+            assert file.getvalue() == result.text
+
+            if json_string.rstrip() == json_string.rstrip(" \t\n\r"):  # see `test_bytes`
+                result = fix_lazy(json_string.encode(), allow, use_fast_fix)
+                assert tuple(result) == fixer(json_string.encode(), allow)
+
+                file = BytesIO()
+                result.write_to(file)
+                assert file.getvalue() == result.text
+
+
+def test_fix_lazy_examples():
+    json_string = '{"a": [1, 2], "b": "xyz\\u12'
+    result = fix_lazy(json_string)
+    assert (result.cut, result.tail) == (len(json_string) - len("\\u12"), '"}')
+    assert result.source is json_string
+    assert result.head == '{"a": [1, 2], "b": "xyz'
+
+    assert fix_lazy(b"[1, 2, ").text == b"[1, 2]"
+    assert fix_lazy('["a", "b', ~STR).text == '["a"]'
+
+
+@settings(deadline=None)
+@given(json.map(dumps), sampled_from(["\n", " ", ""]), data())
+def test_split_documents(json_string, separator, data):
+    if json_string[0] not in '[{"':
+        separator = separator or "\n"  # adjacent atoms would run into each other
+
+    documents = separator.join([json_string] * 3)
+    expected = str([loads(json_string)] * 3)
+
+    cuts = sorted(data.draw(integers(0, len(documents))) for _ in range(5))
+    chunks = [documents[i:j] for i, j in zip([0, *cuts], [*cuts, len(documents)])]
+    assert str(list(split_documents(chunks))) == expected
+
+    encoded = documents.encode()
+    chunks = [encoded[i:j] for i, j in zip([0, *cuts], [*cuts, len(encoded)])]  # multi-byte characters may be split
+    assert str(list(split_documents(chunks))) == expected
+
+    splitter = DocumentSplitter()
+    assert str([document for end in range(len(documents) + 1) for document in splitter.update(documents[:end])] + splitter.close()) == expected
+
+
+def test_split_documents_examples():
+    splitter = DocumentSplitter()
+    assert splitter.feed('{"a": [1, "]"]}{"b"') == [{"a": [1, "]"]}]
+    assert splitter.partial() == {}  # the key has no value yet
+    assert splitter.feed(': 2}\n[1, 2]\n3 "x\\"" tr') == [{"b": 2}, [1, 2], 3, 'x"']
+    assert splitter.close() == [True]
+
+    splitter = DocumentSplitter(~OBJ)
+    assert splitter.feed('[1] {"a": 1') == [[1]]
+    with raises(PartialJSON):
+        splitter.close()
+
+    splitter = DocumentSplitter()
+    with raises(MalformedJSON):
+        splitter.feed('{"a" 1} [2] ')
+    assert splitter.feed("") == [[2]]
+
+    splitter = DocumentSplitter()
+    assert splitter.feed('{"a": 1}\n{"b": 2}\n{"c": x}\n{"d": 4}\n') == [{"a": 1}, {"b": 2}]
+    with raises(MalformedJSON):
+        splitter.feed('{"e"')
+    assert splitter.feed(": 5}") == [{"d": 4}, {"e": 5}]
+
+    splitter = DocumentSplitter()
+    assert splitter.feed("1 ] 2 ") == [1]
+    with raises(MalformedJSON):
+        splitter.feed("")
+    assert splitter.feed("") == [2]
+
+    splitter = DocumentSplitter()
+    assert splitter.feed("[1] [} [3] [4") == [[1]]
+    with raises(MalformedJSON):
+        splitter.close()
+    assert splitter.close() == [[3], [4]]
+
+
+@settings(deadline=None)
+@given(json.map(lambda x: dumps(x, ensure_ascii=False)), integers(0, ALL).map(Allow), sampled_from([(3, 2), (7, 1), (4096, 4096)]), data())
+def test_fix_file(json_string, allow, sizes, data):
+    from os.path import join
+    from tempfile import TemporaryDirectory
+
+    from partial_json_parser.core import files
+
+    default = files.BLOCK_SIZE, files.BISECT_SIZE
+    files.BLOCK_SIZE, files.BISECT_SIZE = sizes  # small blocks so that every path is taken
+
+    encoded = json_string.encode()
+
+    try:
+        with TemporaryDirectory() as directory:
+            path = join(directory, "data.json")
+
+            for end in sorted({data.draw(integers(1, len(encoded))) for _ in range(5)} | {len(encoded)}):  # a few prefixes, as every one is slow
+                text = encoded[:end].decode(errors="ignore")
+                if text.rstrip() != text.rstrip(" \t\n\r"):
+                    continue  # see `test_bytes`
+
+                with open(path, "wb") as file:
+                    file.write(encoded[:end])
+
+                try:
+                    head, tail = fix_fast(encoded[:end], allow)
+                except PartialJSON:
+                    with raises(PartialJSON):
+                        fix_file(path, allow)
+                else:
+                    assert fix_file(path, allow) == (len(head), tail)
+
+    finally:
+        files.BLOCK_SIZE, files.BISECT_SIZE = default
+
+
+def test_repair_file():
+    from os.path import join
+    from tempfile import TemporaryDirectory
+
+    from partial_json_parser.repair import main
+
+    with TemporaryDirectory() as directory:
+        path, output = join(directory, "data.json"), join(directory, "output.json")
+
+        with open(path, "wb") as file:
+            file.write('{"a": [1, 2], "b": "日本'.encode()[:-1])
+
+        assert repair_file(path, output=output) == (len('{"a": [1, 2], "b": "日'.encode()), b'"}')
+        with open(output, "rb") as file:
+            assert loads(file.read()) == {"a": [1, 2], "b": "日"}
+
+        main([path, "--allow", "OBJ|ARR"])
+        with open(path, "rb") as file:
+            assert loads(file.read()) == {"a": [1, 2]}
+
+        assert repair_file(path) == (len('{"a": [1, 2]}'), b"")
+
+
+@settings(deadline=None)
+@given(json.map(dumps), sampled_from(["Sure! Here it is: ", "```json\n", "```py\nx = [1]\n```\nThe answer:\n```\n  "]), data())
+def test_json_locator(json_string, prose, data):
+    if json_string[0] not in "[{" and not prose.endswith("```\n  "):
+        prose = "```JSON\n"  # atoms and strings are only found inside fences
+
+    text = prose + json_string + "\n```\nHope it helps [1] {}"
+    cuts = sorted(data.draw(integers(0, len(text))) for _ in range(5))
+
+    locator = JSONLocator()
+    for i, j in zip([0, *cuts], [*cuts, len(text)]):
+        locator.feed(text[i:j])
+        if locator.found:
+            assert text[locator.start :].startswith(locator.payload)
+            assert str(locator.parse_json()) == str(parse_json(locator.payload))
+
+    assert (locator.start, locator.end) == (len(prose), len(prose) + len(json_string))
+    assert str(locator.parse_json()) == str(loads(json_string))
+
+
+def test_json_locator_examples():
+    locator = JSONLocator()
+    assert not locator.feed("I found [three] items: [{")
+    assert locator.feed('"a": 1}, 2') is False
+    assert locator.parse_json() == [{"a": 1}, 2]
+    assert locator.feed("] as requested [x]") is True
+    assert (locator.start, locator.end, locator.payload) == (23, 36, '[{"a": 1}, 2]')
+
+    locator = JSONLocator(~STR)
+    with raises(PartialJSON):
+        locator.parse_json()
+    locator.feed("```python\nprint({'a': 1})\n```\n```js")
+    assert not locator.found
+    locator.feed('on\n{"text": "abc')
+    assert locator.ensure_json() == "{}"
+
+
+@settings(deadline=None)
+@given(json.map(dumps), integers(1, 5), integers(1, 4))
+def test_stream_multiplexer(json_string, step, count):
+    multiplexer = StreamMultiplexer()
+    chunks = [json_string[i : i + step] for i in range(0, len(json_string), step)]
+
+    for end, chunk in zip(accumulate(map(len, chunks)), chunks):
+        for index in range(count):  # interleaved like the arguments of parallel tool calls
+            multiplexer.feed(("call", index), chunk)
+
+        try:
+            expected = str(parse_json(json_string[:end]))
+        except PartialJSON:
+            assert multiplexer.flush() == {}
+        else:
+            assert [(key, str(value)) for key, value in multiplexer.flush().items()] == [(("call", index), expected) for index in range(count)]
+            assert multiplexer.flush() == {}
+
+    assert multiplexer.buffered == len(json_string) * count
+    assert [str(multiplexer.close(("call", index))) for index in range(count)] == [str(loads(json_string))] * count
+    assert len(multiplexer) == multiplexer.buffered == 0
+
+
+def test_stream_multiplexer_eviction():
+    from threading import Thread
+
+    evicted = []
+    multiplexer = StreamMultiplexer(~OBJ, max_chars=10, on_evict=lambda *args: evicted.append(args))
+
+    multiplexer.feed("a", '{"x": "ab')
+    assert multiplexer.flush() == {}  # the object is not allowed to be partial
+    multiplexer.feed("b", "[1, 2")
+    assert evicted == [("a", "memory")] and "a" not in multiplexer
+    assert multiplexer.flush() == {"b": [1, 2]}
+
+    with raises(MalformedJSON):
+        multiplexer.feed("c", "]]")
+    assert "c" not in multiplexer
+
+    multiplexer = StreamMultiplexer(max_idle=0, on_evict=lambda *args: evicted.append(args))
+    multiplexer.feed("d", "[")
+    multiplexer.feed("e", "[")
+    assert evicted[-1] == ("d", "idle") and list(multiplexer.streams) == ["e"]
+
+    multiplexer = StreamMultiplexer(on_evict=lambda *args: evicted.append(args))
+    multiplexer.feed("f", "[1, 2")
+    multiplexer.feed("g", '{"a": 1, 2')  # only found to be malformed when it is completed
+    assert multiplexer.flush() == {"f": [1, 2]}
+    assert evicted[-1] == ("g", "malformed") and list(multiplexer.streams) == ["f"] and multiplexer.buffered == len("[1, 2")
+    multiplexer.feed("f", ", 3")
+    assert multiplexer.flush() == {"f": [1, 2, 3]}
+
+    def parse_and_feed(json_string):  # the streams are parsed outside of the lock, so feeding meanwhile does not deadlock
+        multiplexer.feed("h", "[")
+        return loads(json_string)
+
+    multiplexer.feed("f", "]")
+    assert multiplexer.flush(parse_and_feed) == {"f": [1, 2, 3]}
+    assert multiplexer.flush() == {"h": []}
+
+    multiplexer = StreamMultiplexer()
+    threads = [Thread(target=lambda i=i: [multiplexer.feed(i % 5, char) for char in "[1, 2, 3]"]) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert multiplexer.buffered == 10 * len("[1, 2, 3]")
+
+
+def test_compile_allow():
+    profile = compile_allow(~STR)
+    assert compile_allow(int(~STR)) is profile and compile_allow(profile) is profile
+    assert profile == ~STR and Allow(profile) is ~STR and STR not in profile and NUM in profile
+    assert not profile.STR and profile.NUM and profile.COLLECTION and not profile.ALL
+
+    for allow in range(ALL + 1):
+        for json_string in ('{"a": [1, 2, {"b": tr', '["x", -Inf', '{"a": nu'):
+            for fixer in (fix, fix_fast):
+                try:
+                    expected = fixer(json_string, Allow(allow))
+                except PartialJSON:
+                    with raises(PartialJSON):
+                        fixer(json_string, compile_allow(allow))
+                else:
+                    assert fixer(json_string, compile_allow(allow)) == expected
+
+
+def same_numbers(value, expected):
+    """compare a value decoded with `numeric_arrays` to the plain one, allowing the integers in float arrays to be rounded"""
+
+    from array import array
+    from math import isclose
+
+    if isinstance(value, array):
+        assert isinstance(expected, list) and expected and all(type(item) in (int, float) for item in expected)
+        assert value.typecode == ("q" if all(type(item) is int for item in expected) else "d")
+        return len(value) == len(expected) and all(a == b or a != a and b != b or isclose(a, b) for a, b in zip(value, expected))
+    if isinstance(value, list):
+        return isinstance(expected, list) and len(value) == len(expected) and all(map(same_numbers, value, expected))
+    if isinstance(value, dict):
+        return isinstance(expected, dict) and value.keys() == expected.keys() and all(same_numbers(value[key], expected[key]) for key in value)
+    return str(value) == str(expected)
+
+
+@settings(deadline=None)
+@given(json.map(dumps), integers(0, ALL).map(Allow), integers(1, 5))
+def test_numeric_arrays(json_string, allow, step):
+    parser = IncrementalParser(allow, numeric_arrays="array")
+
+    for end in range(step, len(json_string) + step, step):
+        parser.append(json_string[end - step : end])
+        try:
+            expected = parse_json(json_string[:end], allow)
+        except PartialJSON:
+            with raises(PartialJSON):
+                parser.parse_json()
+        else:
+            assert same_numbers(parser.parse_json(), expected)
+
+    assert same_numbers(compact_arrays(loads(json_string)), loads(json_string))
+
+
+def test_numeric_arrays_examples():
+    from array import array
+
+    parser = IncrementalParser(numeric_arrays="array")
+    parser.append('{"vector": [1, 2, 3')
+    assert parser.parse_json() == {"vector": array("q", [1, 2, 3])}
+    parser.append(".5, 1e")
+    assert parser.parse_json() == {"vector": array("d", [1, 2, 3.5, 1])}  # the partial exponent is dropped like `complete_num` does
+    assert IncrementalParser(~NUM, numeric_arrays="array").feed("[1, 2, 3.") == "[1, 2]"
+
+    parser.append('3], "rows": [[1, 2], [3, "x"], []]')
+    assert parser.parse_json() == {"vector": array("d", [1, 2, 3.5, 1000]), "rows": [array("q", [1, 2]), [3, "x"], []]}
+
+    assert compact_arrays([True, 1]) == [True, 1] and compact_arrays([2**64]) == [2**64]
+
+    # the same demotion rule applies while the array is open and once it is closed
+    for json_string in (
+        "[1.5, 18446744073709551616, 2.5]",
+        "[1, 9223372036854775808, 2.5]",
+        "[1, 9223372036854775808, 2]",
+        "[1.5, NaN, -Infinity, 2]",
+        "[0.5, 9223372036854775807]",
+    ):
+        prefix = json_string[: json_string.rindex(",") + 2]
+        parser = IncrementalParser(numeric_arrays="array")
+        parser.append(prefix)
+        partial = parser.parse_json()
+        assert str(partial) == str(compact_arrays(parse_json(prefix)))
+        parser.append(json_string[len(prefix) :])
+        assert type(partial) is type(parser.parse_json()) is type(compact_arrays(loads(json_string)))
+
+    assert compact_arrays([0.5, 2**63]) == [0.5, 2**63]
+    with raises(ValueError):
+        IncrementalParser(numeric_arrays="list")
+
+
+@settings(deadline=None)
+@given(json.map(lambda x: dumps(x, ensure_ascii=False)), integers(0, ALL).map(Allow), data())
+def test_checkpoint(json_string, allow, data):
+    split = data.draw(integers(0, len(json_string)))
+    end = data.draw(integers(max(split, 1), len(json_string)))
+
+    parser = IncrementalParser(allow)
+    parser.append(json_string[:split])
+    checkpoint = parser.checkpoint()
+
+    resumed = IncrementalParser.resume(json_string[:end], checkpoint, allow)
+    state = ScanState()
+    state.scan(json_string[:end])
+    assert [getattr(resumed.state, key) for key in ScanState.__slots__] == [getattr(state, key) for key in ScanState.__slots__]
+
+    try:
+        expected = fix_fast(json_string[:end], allow)
+    except PartialJSON:
+        with raises(PartialJSON):
+            resumed.fix()
+    else:
+        assert resumed.fix() == expected
+
+    resumed = IncrementalParser.resume(json_string[:end].encode(), checkpoint, allow)
+    assert resumed.buffer == json_string[:end]
+
+
+def test_checkpoint_examples():
+    from pickle import dumps as pickle
+    from pickle import loads as unpickle
+
+    parser = IncrementalParser()
+    parser.append('{"a": [1, {"b": "x\\"y", "c": "hel')
+    checkpoint = unpickle(pickle(parser.checkpoint()))
+    assert len(checkpoint) < 100
+
+    resumed = IncrementalParser.resume(parser.buffer + 'lo"}, 2', checkpoint)
+    assert resumed.parse_json() == {"a": [1, {"b": 'x"y', "c": "hello"}, 2]}
+
+    for buffer, bad in (
+        ('{"a": [2, {"b": "x\\"y", "c": "hel', checkpoint),  # another buffer
+        ('{"a"', checkpoint),  # shorter than the checkpoint
+        (parser.buffer, checkpoint[:-1]),
+        (parser.buffer, checkpoint[:4] + b"\x02" + checkpoint[5:]),  # another version
+        (parser.buffer, b"{}"),
+        (parser.buffer, checkpoint[:-1] + b"\xff"),  # not a bracket, nor even ASCII
+        (parser.buffer, checkpoint[:7] + b"\xff" + checkpoint[8:]),
+    ):
+        with raises(InvalidCheckpoint):
+            IncrementalParser.resume(buffer, bad)
+
+    buffer = '{"head": "' + "x" * 3000 + '", "a": {"b": [' + "1, " * 1000  # the open brackets are far from both ends
+    checkpoint = IncrementalParser.resume(buffer, IncrementalParser().checkpoint()).checkpoint()
+    edited = buffer.replace('"a": {', '"A": {')
+    assert len(edited) == len(buffer) and edited[:1024] == buffer[:1024] and edited[-1024:] == buffer[-1024:]
+    with raises(InvalidCheckpoint):
+        IncrementalParser.resume(edited, checkpoint)  # the brackets have not moved, but what is around them has
+
+
+@settings(deadline=None)
+@given(json.map(lambda x: dumps(x, ensure_ascii=False)), data())
+def test_checkpoint_corrupted(json_string, data):
+    parser = IncrementalParser()
+    parser.append('{"a": [' + json_string[: data.draw(integers(0, len(json_string)))])  # with open brackets to corrupt
+    checkpoint = bytearray(parser.checkpoint())
+
+    for _ in range(data.draw(integers(1, 3))):
+        checkpoint[data.draw(integers(0, len(checkpoint) - 1))] = data.draw(integers(0, 255))
+
+    try:
+        IncrementalParser.resume(parser.buffer, bytes(checkpoint))
+    except InvalidCheckpoint:  # and nothing else
+        pass
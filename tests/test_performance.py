@@ -1,11 +1,24 @@
 from functools import partial
 from json import dumps
 from timeit import timeit
+from tracemalloc import get_traced_memory, start, stop
 
 from hypothesis import HealthCheck, given, settings
 from hypothesis import strategies as st
 
-from partial_json_parser import ALL, ARR, COLLECTION, OBJ, SPECIAL, STR, fix, fix_fast
+from partial_json_parser import (
+    ALL,
+    ARR,
+    COLLECTION,
+    OBJ,
+    SPECIAL,
+    STR,
+    Allow,
+    IncrementalParser,
+    fix,
+    fix_fast,
+    parse_json,
+)
 
 
 def deep_json(depth: int):
@@ -15,6 +28,16 @@ def deep_json(depth: int):
     return strategy
 
 
+def peak(function):
+    """the peak memory traced while calling `function`"""
+
+    start()
+    function()
+    result = get_traced_memory()[1]
+    stop()
+    return result
+
+
 dumps = partial(dumps, ensure_ascii=False)
 
 
@@ -55,8 +78,358 @@ def test_incomplete_json_faster(json_string: str, allow):
         print(f" {len(json_string):>10} chars - {(v1 - v2) / v1:>6.1%} slower : {allow!r}")
 
 
+def test_linear_scaling():
+    per_item = []
+    for length in (1_000, 10_000, 100_000):
+        json_string = dumps(list(range(length)))[:-1]  # an unclosed array of `length` numbers
+        t = timeit(lambda: fix(json_string), number=3) * 1000 / 3
+        per_item.append(t / length)
+        print(f" {length:>10} items - {t:>8.2f} ms - {t / length * 1000:.3f} us/item")
+
+    assert per_item[-1] < per_item[0] * 5, "fix() should scale linearly with array length"
+
+
+def test_incremental_parse_json_faster():
+    json_string = dumps([{"id": i, "name": f"record {i}", "tags": ["a", "b"]} for i in range(300)])
+    chunks = [json_string[i : i + 10] for i in range(0, len(json_string), 10)]
+
+    def reparse():
+        for end in range(1, len(chunks) + 1):
+            parse_json("".join(chunks[:end]))
+
+    def materialize():
+        parser = IncrementalParser()
+        for chunk in chunks:
+            parser.append(chunk)
+            parser.parse_json()
+
+    t1 = timeit(reparse, number=1) * 1000
+    t2 = timeit(materialize, number=1) * 1000
+    print(f" {len(json_string):>10} chars - {t1:>8.1f} ms reparsing - {t2:>8.1f} ms incrementally - {t1 / t2:.1f}x")
+
+
+def test_scan_memory():
+    from partial_json_parser.core.myelin import ScanState, scan
+
+    json_string = dumps([{"key": i, "values": [str(i), [i, i + 1]]} for i in range(50_000)])[:-2]
+
+    old = peak(lambda: scan(json_string))
+    new = peak(lambda: ScanState().scan(json_string))
+    lazy = peak(lambda: fix_fast(json_string))
+
+    print(f" {len(json_string):>10} chars - token list {old / 2**20:>6.1f} MiB - scan state {new / 2**20:>6.1f} MiB - fix_fast {lazy / 2**20:>6.1f} MiB")
+
+    assert new < old
+
+
+def test_parse_many_throughput():
+    from partial_json_parser import parse_many
+
+    records = [dumps({"id": i, "text": "lorem ipsum " * (i % 20), "tags": list(range(i % 10))}) for i in range(20_000)]
+    json_strings = [record[: len(record) * 3 // 4] for record in records]
+
+    t1 = timeit(lambda: [parse_json(json_string) for json_string in json_strings], number=1)
+    t2 = timeit(lambda: list(parse_many(json_strings)), number=1)
+
+    print(f" {len(json_strings):>10} docs - serial loop {len(json_strings) / t1:>9.0f} docs/s - parse_many {len(json_strings) / t2:>9.0f} docs/s")
+
+
+def test_prefix_cache_faster():
+    from partial_json_parser import disable_prefix_cache, enable_prefix_cache
+
+    json_string = dumps({"arguments": [{"id": i, "text": f"item {i}"} for i in range(300)]})
+    prefixes = [json_string[:i] for i in range(1, len(json_string), 5)]
+
+    t1 = timeit(lambda: [parse_json(prefix) for prefix in prefixes], number=1) * 1000
+    cache = enable_prefix_cache()
+    try:
+        t2 = timeit(lambda: [parse_json(prefix) for prefix in prefixes], number=1) * 1000
+    finally:
+        disable_prefix_cache()
+
+    print(f" {len(json_string):>10} chars - {t1:>8.1f} ms uncached - {t2:>8.1f} ms cached - {cache.info()}")
+
+
+def test_auto_dispatch_faster():
+    complete = [dumps([{"id": i, "values": list(range(i % 30))} for i in range(n)]) for n in range(1, 200)]
+    partial = [json_string[: len(json_string) // 2] for json_string in complete]
+
+    for name, json_strings in (("complete", complete), ("partial", partial)):
+        t1 = timeit(lambda: [parse_json(json_string) for json_string in json_strings], number=3) * 1000
+        t2 = timeit(lambda: [parse_json(json_string, use_fast_fix="auto") for json_string in json_strings], number=3) * 1000
+        print(f" {name:>10} - {t1:>8.1f} ms default - {t2:>8.1f} ms auto")
+
+
+def test_iterative_engine():
+    try:  # as `tests.test_performance`, like `pdm test-performance` does
+        from . import recursive_complete
+    except ImportError:  # as a top-level module, like pytest does
+        import recursive_complete
+
+    for name, json_string in (("deep", '{"a": [' * 150 + "1"), ("wide", dumps([{"id": i, "values": [i, str(i)]} for i in range(10_000)])[:-2])):
+        t1 = timeit(lambda: recursive_complete.fix(json_string), number=20) * 1000
+        t2 = timeit(lambda: fix(json_string), number=20) * 1000
+        print(f" {name:>10} - {len(json_string):>10} chars - {t1:>8.1f} ms recursive - {t2:>8.1f} ms iterative")
+
+    for depth in (10_000, 100_000):
+        json_string = '{"a": [' * depth + "1"
+        t = timeit(lambda: fix(json_string), number=1) * 1000
+        print(f" {depth:>10} levels - {t:>8.1f} ms")
+
+
+def test_parse_path_faster():
+    from partial_json_parser import parse_path
+
+    rows = [{"id": i, "text": f"row {i}", "values": [i, i / 2, None]} for i in range(20_000)]
+
+    for name, value in (("first", {"query": "weather", "rows": rows}), ("last", {"rows": rows, "query": "weather"})):
+        json_string = dumps(value)[:-3]
+        t1 = timeit(lambda: parse_json(json_string)["query"], number=5) * 1000
+        t2 = timeit(lambda: parse_path(json_string, ["query"]), number=5) * 1000
+        print(f" {name:>10} - {len(json_string):>10} chars - {t1:>8.1f} ms parse_json - {t2:>8.1f} ms parse_path")
+
+
+def test_events_memory():
+    from partial_json_parser import EventParser
+
+    row = dumps({"id": 1, "text": "lorem ipsum", "values": [1.5, None, True]})
+    chunks = ["["] + [row + "," for _ in range(50_000)]
+
+    def run():
+        parser = EventParser()
+        return sum(len(parser.feed(chunk)) for chunk in chunks)
+
+    t = timeit(run, number=1) * 1000
+
+    start()
+    count = run()
+    memory = get_traced_memory()[1]
+    stop()
+
+    print(f" {len(chunks) * len(row):>10} chars - {count:>8} events - {t:>8.1f} ms - peak {memory / 2**10:>6.1f} KiB")
+
+    assert memory < 2**20
+
+
+def test_string_deltas_faster():
+    from partial_json_parser import EventParser
+
+    json_string = dumps({"role": "assistant", "content": "lorem ipsum dolor sit amet, " * 4000})
+    chunks = [json_string[i : i + 4] for i in range(0, len(json_string), 4)]
+
+    def run(deltas: bool):
+        parser = EventParser(deltas=deltas)
+        for chunk in chunks:
+            parser.feed(chunk)
+
+    t1 = timeit(lambda: run(False), number=1) * 1000
+    t2 = timeit(lambda: run(True), number=1) * 1000
+    print(f" {len(json_string):>10} chars - {t1:>8.1f} ms partial strings - {t2:>8.1f} ms deltas - {t1 / t2:.1f}x")
+
+
+def test_parse_direct():
+    from partial_json_parser import parse_direct
+
+    for name, item in (("small", {"id": 1, "text": "x"}), ("large", {"id": 1, "text": "x" * 10_000}), ("huge", "x" * 10_000_000)):
+        json_string = dumps({"rows": [item] * (2_000_000 // len(dumps(item)) + 1)})[:-5]
+        t1 = timeit(lambda: parse_json(json_string), number=3) * 1000
+        t2 = timeit(lambda: parse_direct(json_string), number=3) * 1000
+        m1 = peak(lambda: parse_json(json_string)) / 2**20
+        m2 = peak(lambda: parse_direct(json_string)) / 2**20
+        print(f" {name:>10} - {len(json_string):>10} chars - parse_json {t1:>8.1f} ms {m1:>6.1f} MiB - parse_direct {t2:>8.1f} ms {m2:>6.1f} MiB")
+
+
+def test_fix_lazy_memory():
+    from os import devnull
+
+    from partial_json_parser import fix_lazy
+
+    rows = dumps([{"id": i, "text": "x" * 100} for i in range(50_000)])[:-1] + ", "
+    string = dumps(["x" * 10_000_000])[:-1] + ", 12."
+
+    for name, json_string in (("rows", rows), ("string", string)):
+        t1 = timeit(lambda: fix_fast(json_string), number=3) * 1000
+        t2 = timeit(lambda: fix_lazy(json_string), number=3) * 1000
+        m1 = peak(lambda: fix_fast(json_string)) / 2**20
+        with open(devnull, "w") as file:
+            m2 = peak(lambda: fix_lazy(json_string).write_to(file)) / 2**20
+        print(f" {name:>10} - {len(json_string):>10} chars - fix_fast {t1:>8.1f} ms {m1:>6.1f} MiB - fix_lazy {t2:>8.1f} ms {m2:>6.1f} MiB (written)")
+
+
+def test_split_documents_throughput():
+    from json import loads
+
+    from partial_json_parser import split_documents
+
+    lines = "".join(dumps({"id": i, "level": "info", "message": f"request {i} done", "tags": ["a", "b"], "took": i / 7}) + "\n" for i in range(200_000))
+    concatenated = lines.replace("\n", "")
+    size = len(lines) / 2**20
+
+    t1 = timeit(lambda: [loads(line) for line in lines.splitlines()], number=1)
+    t2 = timeit(lambda: list(split_documents(lines[i : i + 2**16] for i in range(0, len(lines), 2**16))), number=1)
+    t3 = timeit(lambda: list(split_documents(concatenated[i : i + 2**16] for i in range(0, len(concatenated), 2**16))), number=1)
+
+    print(f" {size:.1f} MiB - loads per line {size / t1:>6.1f} MiB/s - split_documents {size / t2:>6.1f} MiB/s - without newlines {size / t3:>6.1f} MiB/s")
+
+
+def test_repair_file():
+    from os.path import join
+    from tempfile import TemporaryDirectory
+
+    from partial_json_parser import ensure_json, fix_file
+
+    with TemporaryDirectory() as directory:
+        path = join(directory, "data.json")
+        with open(path, "w") as file:
+            file.write(dumps([{"id": i, "text": 'x\\"y' * 20, "tags": [[i], {"a": None}]} for i in range(500_000)])[:-20])
+
+        def read_and_fix():
+            with open(path, "rb") as file:
+                return ensure_json(file.read())
+
+        t1 = timeit(read_and_fix, number=1)
+        t2 = timeit(lambda: fix_file(path), number=1)
+
+        with open(path, "rb") as file:
+            size = len(file.read()) / 2**20
+
+        print(f" {size:>6.1f} MiB - read and ensure_json {t1 * 1000:>8.1f} ms - fix_file {t2 * 1000:>8.1f} ms")
+
+
+def test_json_locator_faster():
+    from re import DOTALL, compile
+
+    from partial_json_parser import JSONLocator, ensure_json
+
+    search_fenced = compile(r"```json\n(.*?)(?:```|$)", DOTALL).search
+    text = "Let me think about it. " * 200 + "\n```json\n" + dumps([{"id": i, "text": "x" * 50} for i in range(500)], indent=2) + "\n```\nDone."
+    tokens = [text[i : i + 4] for i in range(0, len(text), 4)]
+
+    def rescan():
+        received = ""
+        for token in tokens:
+            received += token
+            match = search_fenced(received)
+            if match is not None and match.group(1).strip():
+                ensure_json(match.group(1))
+
+    def locate():
+        locator = JSONLocator()
+        for token in tokens:
+            locator.feed(token)
+            if locator.found:
+                locator.ensure_json()
+
+    t1 = timeit(rescan, number=1)
+    t2 = timeit(locate, number=1)
+
+    print(f" {len(tokens):>6} tokens - regex and ensure_json {t1 * 1000:>8.1f} ms - JSONLocator {t2 * 1000:>8.1f} ms - {t1 / t2:.1f}x")
+
+
+def test_stream_multiplexer_scaling():
+    from partial_json_parser import StreamMultiplexer
+
+    arguments = dumps({"query": "weather in Paris", "units": "metric", "days": [1, 2, 3]})
+    chunks = [arguments[i : i + 3] for i in range(0, len(arguments), 3)]
+
+    for count in (100, 10_000, 50_000):
+        multiplexer = StreamMultiplexer(max_chars=2**30, max_idle=3600)
+
+        def feed_all():
+            for chunk in chunks:
+                for stream_id in range(count):
+                    multiplexer.feed(stream_id, chunk)
+
+        t1 = timeit(feed_all, number=1) / (count * len(chunks)) * 1e6
+        multiplexer.flush()
+        multiplexer.feed(0, " ")
+        t2 = timeit(multiplexer.flush, number=1) * 1000
+        print(f" {count:>6} streams - {t1:>5.2f} µs per chunk - flush of one changed stream {t2:>6.3f} ms")
+
+
+def test_allow_profiles():
+    from partial_json_parser import compile_allow
+
+    allow = ~STR
+    profile = compile_allow(allow)
+
+    checks = {
+        "Allow(...)": (lambda: Allow(allow), lambda: compile_allow(allow)),
+        "STR in allow": (lambda: STR in allow, lambda: profile.STR),
+        "(STR | COLLECTION) in allow": (lambda: (STR | COLLECTION) in allow, lambda: profile.STR and profile.COLLECTION),
+    }
+
+    for name, (check, compiled) in checks.items():
+        t1 = timeit(check, number=100_000) * 10
+        t2 = timeit(compiled, number=100_000) * 10
+        print(f" {name:>28} - IntFlag {t1:.3f} µs - profile {t2:.3f} µs")
+
+    for json_string in ("[1, 2", '{"a": [1, 2, {"b": tr'):
+        for fixer in (fix, fix_fast):
+            t = timeit(lambda: fixer(json_string, profile), number=20_000) / 20_000 * 1e6
+            print(f" {json_string!r:>28} - {fixer.__name__:>8} {t:>5.2f} µs per call")
+
+
+def test_numeric_arrays_faster():
+    from random import random
+    from sys import getsizeof
+
+    vector = dumps({"embedding": [random() for _ in range(200_000)]})
+    chunks = [vector[i : i + 2**15] for i in range(0, len(vector), 2**15)]
+
+    def stream(numeric_arrays):
+        parser = IncrementalParser(numeric_arrays=numeric_arrays)
+        for chunk in chunks:
+            parser.append(chunk)
+            value = parser.parse_json()
+        return value
+
+    t0 = timeit(lambda: [parse_json(vector[: i + 2**15]) for i in range(0, len(vector), 2**15)], number=1) * 1000
+    t1 = timeit(lambda: stream(None), number=1) * 1000
+    t2 = timeit(lambda: stream("array"), number=1) * 1000
+
+    embedding = stream(None)["embedding"]
+    m1 = (getsizeof(embedding) + sum(map(getsizeof, embedding))) / 2**20
+    m2 = getsizeof(stream("array")["embedding"]) / 2**20
+
+    print(f" {len(chunks):>4} chunks - parse_json {t0:>8.1f} ms - lists {t1:>8.1f} ms {m1:>5.1f} MiB - numeric arrays {t2:>8.1f} ms {m2:>5.1f} MiB")
+
+
+def test_checkpoint_resume():
+    json_string = dumps([{"id": i, "text": "x" * 100, "tags": [[i], {"a": None}]} for i in range(100_000)])[:-100_000]
+
+    parser = IncrementalParser()
+    parser.append(json_string)
+    checkpoint = parser.checkpoint()
+    rest = json_string[-1000:]
+
+    t1 = timeit(lambda: fix_fast(json_string + rest), number=3) / 3 * 1000
+    t2 = timeit(lambda: IncrementalParser.resume(json_string + rest, checkpoint).fix(), number=3) / 3 * 1000
+
+    print(f" {len(json_string):>10} chars - rescan with fix_fast {t1:>8.1f} ms - resume from {len(checkpoint)} bytes {t2:>8.1f} ms")
+
+
 def main():
     print()
     test_incomplete_json_faster()
     test_complete_json_faster()
+    test_linear_scaling()
+    test_incremental_parse_json_faster()
+    test_scan_memory()
+    test_parse_many_throughput()
+    test_prefix_cache_faster()
+    test_auto_dispatch_faster()
+    test_iterative_engine()
+    test_parse_path_faster()
+    test_events_memory()
+    test_string_deltas_faster()
+    test_parse_direct()
+    test_fix_lazy_memory()
+    test_split_documents_throughput()
+    test_repair_file()
+    test_json_locator_faster()
+    test_stream_multiplexer_scaling()
+    test_allow_profiles()
+    test_numeric_arrays_faster()
+    test_checkpoint_resume()
     print()